@@ -0,0 +1,542 @@
+"""Banco de pruebas de rendimiento del pipeline con un servidor local de fixtures.
+
+Sirve RSS y documentos xml.php grabados de boe.es (--grabar) o sintéticos
+(números de miles de entradas y documentos de varios MB) y mide
+obtener_nuevas_entradas, obtener_contenido_xml / parsear_xml,
+filtrar_entradas y actualizar_datos_boe con distintos tamaños de almacén.
+
+Ejemplos:
+    python benchmark.py --entradas 2000 --tamanos-almacen 0,10000,50000
+    python benchmark.py --grabar fixtures/boe
+    python benchmark.py --fixtures fixtures/boe --comparar benchmarks/resultados/anterior.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+DIRECTORIO_RESULTADOS = 'benchmarks/resultados'
+
+DEPARTAMENTOS = [
+    'MINISTERIO PARA LA TRANSFORMACIÓN DIGITAL Y DE LA FUNCIÓN PÚBLICA',
+    'MINISTERIO DE HACIENDA', 'MINISTERIO DE INDUSTRIA Y TURISMO',
+    'MINISTERIO DE CIENCIA, INNOVACIÓN Y UNIVERSIDADES', 'COMUNIDAD DE MADRID',
+    'MINISTERIO DE AGRICULTURA, PESCA Y ALIMENTACIÓN', 'BANCO DE ESPAÑA'
+]
+RANGOS = ['Resolución', 'Orden', 'Real Decreto', 'Anuncio', 'Acuerdo']
+PALABRAS = ('de la el en que por con para los las del se una ayudas convocatoria '
+            'programa digitalización pymes subvenciones kit digital consulting '
+            'beneficiarios resolución artículo disposición plazo solicitud').split()
+
+
+def boe_id_sintetico(numero):
+    return f"BOE-A-2099-{numero}"
+
+
+def _texto_sintetico(aleatorio, palabras):
+    return ' '.join(aleatorio.choice(PALABRAS) for _ in range(palabras))
+
+
+def generar_rss(base_url, numeros):
+    """RSS con el formato de boe.es para los números de documento indicados"""
+    publicado = format_datetime(datetime(2099, 1, 2).astimezone())
+    items = []
+    for numero in numeros:
+        aleatorio = random.Random(numero)
+        boe_id = boe_id_sintetico(numero)
+        departamento = aleatorio.choice(DEPARTAMENTOS)
+        titulo = f"{aleatorio.choice(RANGOS)} de {_texto_sintetico(aleatorio, 25)}"
+        items.append(
+            f"<item><title>{escape(titulo)}</title>"
+            f"<link>{base_url}/diario_boe/txt.php?id={boe_id}</link>"
+            f"<description>III. Otras disposiciones - {escape(departamento)} - Referencia: {boe_id}</description>"
+            f"<guid>https://www.boe.es/boe/dias/2099/01/02/pdfs/{boe_id}.pdf</guid>"
+            f"<pubDate>{publicado}</pubDate></item>")
+    return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            '<title>BOE</title>' + ''.join(items) + '</channel></rss>').encode('utf-8')
+
+
+class _CuerposSinteticos:
+    """Cuerpo de documento compartido por tamaño, para servir MB sin generarlos en cada petición"""
+
+    def __init__(self):
+        self._cuerpos = {}
+
+    def cuerpo(self, tamano_kb):
+        if tamano_kb not in self._cuerpos:
+            aleatorio = random.Random(tamano_kb)
+            parrafos = []
+            tamano = 0
+            while tamano < tamano_kb * 1024:
+                parrafo = f'<p class="parrafo">{_texto_sintetico(aleatorio, 60)}</p>\n'
+                parrafos.append(parrafo)
+                tamano += len(parrafo)
+            self._cuerpos[tamano_kb] = ''.join(parrafos)
+        return self._cuerpos[tamano_kb]
+
+    def documento(self, boe_id, tamano_kb):
+        numero = int(boe_id.rsplit('-', 1)[-1]) if boe_id.rsplit('-', 1)[-1].isdigit() else 0
+        aleatorio = random.Random(numero)
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><documento>'
+            f'<metadatos><identificador>{boe_id}</identificador>'
+            f'<titulo>{_texto_sintetico(aleatorio, 25)}</titulo>'
+            f'<departamento codigo="1">{escape(aleatorio.choice(DEPARTAMENTOS))}</departamento>'
+            f'<rango codigo="1">{aleatorio.choice(RANGOS)}</rango>'
+            '<fecha_publicacion>20990102</fecha_publicacion></metadatos>'
+            f'<texto>\n<p class="parrafo">{_texto_sintetico(aleatorio, 200)}</p>\n{self.cuerpo(tamano_kb)}</texto>'
+            '</documento>').encode('utf-8')
+
+
+def _servir(puerto, directorio, entradas, tamano_documento_kb, documentos_grandes_cada,
+            tamano_grande_kb, latencia):
+    """Proceso del servidor de fixtures (separado para no competir por el GIL con el pipeline)"""
+    base_url = f"http://127.0.0.1:{puerto}"
+    cuerpos = _CuerposSinteticos()
+    feeds = {}
+    directorio = Path(directorio) if directorio else None
+
+    def feed(consulta):
+        seccion = consulta.get('s', ['3'])[0]
+        total = int(consulta.get('n', [entradas])[0])
+        inicio = int(consulta.get('desde', [1])[0])
+        clave = (seccion, total, inicio)
+        if clave not in feeds:
+            grabado = directorio / 'rss' / f"s{seccion}.xml" if directorio else None
+            if grabado and grabado.exists():
+                feeds[clave] = grabado.read_bytes().replace(b'https://www.boe.es', base_url.encode())
+            else:
+                feeds[clave] = generar_rss(base_url, range(inicio, inicio + total))
+        return feeds[clave]
+
+    def documento(boe_id):
+        grabado = directorio / 'xml' / f"{boe_id}.xml" if directorio else None
+        if grabado and grabado.exists():
+            return grabado.read_bytes()
+        numero = boe_id.rsplit('-', 1)[-1]
+        grande = (documentos_grandes_cada and numero.isdigit()
+                  and int(numero) % documentos_grandes_cada == 0)
+        return cuerpos.documento(boe_id, tamano_grande_kb if grande else tamano_documento_kb)
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Cabeceras y cuerpo en un solo envío: sin búfer, Nagle + ACK retardado añaden ~40 ms
+        wbufsize = 64 * 1024
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            consulta = parse_qs(url.query)
+            if latencia:
+                time.sleep(latencia)
+            if url.path == '/rss/boe.php':
+                cuerpo, tipo = feed(consulta), 'application/rss+xml'
+            elif url.path == '/diario_boe/xml.php' and 'id' in consulta:
+                cuerpo, tipo = documento(consulta['id'][0]), 'application/xml'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer(('127.0.0.1', puerto), Manejador).serve_forever()
+
+
+class ServidorFixtures:
+    """Servidor HTTP local que imita boe.es (rss/boe.php y diario_boe/xml.php)"""
+
+    def __init__(self, directorio=None, entradas=1000, tamano_documento_kb=32,
+                 documentos_grandes_cada=0, tamano_grande_kb=4096, latencia=0.0):
+        self.puerto = self._puerto_libre()
+        self.base_url = f"http://127.0.0.1:{self.puerto}"
+        self._argumentos = (self.puerto, directorio, entradas, tamano_documento_kb,
+                            documentos_grandes_cada, tamano_grande_kb, latencia)
+        self._proceso = None
+
+    @staticmethod
+    def _puerto_libre():
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def url_rss(self, entradas=None, desde=1):
+        url = f"{self.base_url}/rss/boe.php?s=3&desde={desde}"
+        return url + (f"&n={entradas}" if entradas else '')
+
+    def __enter__(self):
+        contexto = multiprocessing.get_context('spawn')
+        self._proceso = contexto.Process(target=_servir, args=self._argumentos, daemon=True)
+        self._proceso.start()
+        limite = time.monotonic() + 10
+        while time.monotonic() < limite:
+            try:
+                socket.create_connection(('127.0.0.1', self.puerto), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("El servidor de fixtures no arrancó")
+
+    def __exit__(self, *exc):
+        self._proceso.terminate()
+        self._proceso.join()
+
+
+def grabar_fixtures(directorio, secciones=('1', '3'), max_documentos=200):
+    """Descarga de boe.es los RSS y hasta max_documentos xml.php para reproducirlos después"""
+    import requests
+    from utils.almacen import extraer_boe_id
+    from utils.parser_rss import leer_entradas_rss
+
+    directorio = Path(directorio)
+    (directorio / 'rss').mkdir(parents=True, exist_ok=True)
+    (directorio / 'xml').mkdir(parents=True, exist_ok=True)
+    session = requests.Session()
+    enlaces = []
+    for seccion in secciones:
+        response = session.get(f"https://www.boe.es/rss/boe.php?s={seccion}", timeout=30)
+        response.raise_for_status()
+        (directorio / 'rss' / f"s{seccion}.xml").write_bytes(response.content)
+        enlaces += [entrada['link'] for entrada in leer_entradas_rss(response.content)]
+    grabados = 0
+    for enlace in dict.fromkeys(enlaces):
+        boe_id = extraer_boe_id(enlace)
+        if not boe_id or grabados >= max_documentos:
+            continue
+        response = session.get(f"https://www.boe.es/diario_boe/xml.php?id={boe_id}", timeout=30)
+        if response.status_code == 200:
+            (directorio / 'xml' / f"{boe_id}.xml").write_bytes(response.content)
+            grabados += 1
+    print(f"Grabados {len(secciones)} feeds y {grabados} documentos en {directorio}")
+
+
+def percentiles(muestras):
+    """Resumen de latencias en milisegundos"""
+    if not muestras:
+        return {}
+    ordenadas = sorted(muestras)
+    cortes = statistics.quantiles(ordenadas, n=100) if len(ordenadas) > 1 else ordenadas * 99
+    return {
+        'muestras': len(ordenadas),
+        'media_ms': round(statistics.fmean(ordenadas) * 1000, 3),
+        'p50_ms': round(cortes[49] * 1000, 3),
+        'p95_ms': round(cortes[94] * 1000, 3),
+        'p99_ms': round(cortes[98] * 1000, 3),
+        'max_ms': round(ordenadas[-1] * 1000, 3)
+    }
+
+
+class Medicion:
+    """Mide tiempo total y pico de memoria (tracemalloc) de un bloque"""
+
+    def __init__(self, memoria=True):
+        self.memoria = memoria
+        self.duracion = 0.0
+        self.pico_mb = None
+
+    def __enter__(self):
+        if self.memoria:
+            tracemalloc.start()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.duracion = time.perf_counter() - self._inicio
+        if self.memoria:
+            self.pico_mb = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+
+
+def _resultado(medicion, elementos, latencias=None, bytes_procesados=None):
+    resultado = {
+        'duracion_s': round(medicion.duracion, 4),
+        'elementos': elementos,
+        'por_segundo': round(elementos / medicion.duracion, 1) if medicion.duracion else None,
+        'pico_memoria_mb': medicion.pico_mb
+    }
+    if bytes_procesados is not None and medicion.duracion:
+        resultado['mb_por_segundo'] = round(bytes_procesados / 2 ** 20 / medicion.duracion, 2)
+    if latencias:
+        resultado['latencia'] = percentiles(latencias)
+    return resultado
+
+
+def _crear_monitor(directorio, rss_url, tipo_almacen, procesos=0):
+    from boe_monitor import BOEKitMonitor
+    from main import cargar_inclusiones
+    from utils.clasificador import ClasificadorEntradas
+    from utils.config_loader import ConfigLoader
+    clasificador = ClasificadorEntradas.desde_configuracion(
+        cargar_inclusiones(), ConfigLoader.load_config().get('keywords', []))
+    return BOEKitMonitor(rss_url, os.path.join(directorio, 'datos_boe.json'), {},
+                         max_descargas=8, max_por_host=8, tipo_almacen=tipo_almacen,
+                         revalidar_cada=None, procesos=procesos, clasificador=clasificador)
+
+
+def poblar_almacen(almacen, total, desde=10_000_000, lote=5000):
+    """Rellena el almacén con entradas sintéticas (sin XML) para simular su tamaño"""
+    from utils.huellas import calcular_huella
+    for inicio in range(0, total, lote):
+        entradas = []
+        for numero in range(desde + inicio, desde + min(total, inicio + lote)):
+            boe_id = boe_id_sintetico(numero)
+            entrada = {
+                'id': f"https://www.boe.es/boe/dias/2099/01/02/pdfs/{boe_id}.pdf",
+                'titulo': f"Resolución sintética {numero}",
+                'descripcion': f"III. Otras disposiciones - Referencia: {boe_id}",
+                'link': f"https://www.boe.es/diario_boe/xml.php?id={boe_id}",
+                'fecha_publicacion': 'Mon, 02 Jan 2099 00:00:00 +0100',
+                'categoria': 'General', 'departamento': 'No especificado', 'estado': 'pendiente'
+            }
+            entrada['huella'] = calcular_huella(entrada)
+            entradas.append(entrada)
+        almacen.guardar_entradas(entradas)
+
+
+def medir_rss(monitor, repeticiones, memoria):
+    latencias = []
+    entradas = []
+    with Medicion(memoria) as medicion:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            entradas = monitor.obtener_nuevas_entradas()
+            latencias.append(time.perf_counter() - inicio)
+    return entradas, _resultado(medicion, len(entradas) * repeticiones, latencias)
+
+
+def medir_xml(monitor, urls, memoria):
+    """Descarga + parseo en streaming (obtener_contenido_xml) y parseo en memoria (parsear_xml)"""
+    latencias = []
+    contenidos = {}
+    with Medicion(memoria) as descarga:
+        for url in urls:
+            inicio = time.perf_counter()
+            contenidos[url] = monitor.obtener_contenido_xml(url)
+            latencias.append(time.perf_counter() - inicio)
+    resultado_descarga = _resultado(descarga, len(urls), latencias)
+
+    cuerpos = [monitor.session.get(url, timeout=30).content for url in urls]
+    latencias = []
+    with Medicion(memoria) as parseo:
+        for cuerpo in cuerpos:
+            inicio = time.perf_counter()
+            monitor.parsear_xml(cuerpo)
+            latencias.append(time.perf_counter() - inicio)
+    resultado_parseo = _resultado(parseo, len(cuerpos), latencias,
+                                  bytes_procesados=sum(len(cuerpo) for cuerpo in cuerpos))
+    return contenidos, resultado_descarga, resultado_parseo
+
+
+def medir_filtrado(entradas, contenidos, repeticiones, memoria):
+    from main import filtrar_entradas, cargar_inclusiones
+    from utils.coincidencias import BuscadorInclusiones
+    buscador = BuscadorInclusiones(cargar_inclusiones())
+    for entrada in entradas:
+        if contenidos.get(entrada['link']):
+            entrada['contenido_xml'] = contenidos[entrada['link']]
+    latencias = []
+    with Medicion(memoria) as medicion:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            filtrar_entradas(entradas, buscador)
+            latencias.append(time.perf_counter() - inicio)
+    return _resultado(medicion, len(entradas) * repeticiones, latencias)
+
+
+def medir_clasificacion(servidor, entradas, opciones, memoria):
+    """Descarga + parseo + evaluación de inclusiones (clasificar_contenidos_xml) por nº de procesos"""
+    from main import cargar_inclusiones
+    from utils.coincidencias import BuscadorInclusiones
+    buscador = BuscadorInclusiones(cargar_inclusiones())
+    resultados = {}
+    for procesos in opciones.procesos:
+        directorio = tempfile.mkdtemp(prefix='boe_bench_')
+        try:
+            monitor = _crear_monitor(directorio, servidor.url_rss(), opciones.almacen, procesos)
+            try:
+                if monitor.procesador:
+                    # Arranque de los procesos fuera de la medición
+                    monitor.procesador.procesar([('calentamiento', {}, b'<documento/>')])
+                with Medicion(memoria) as medicion:
+                    monitor.clasificar_contenidos_xml(entradas, buscador)
+                resultados[str(procesos)] = _resultado(medicion, len(entradas))
+            finally:
+                monitor.cerrar()
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def medir_actualizacion(servidor, opciones, memoria):
+    """actualizar_datos_boe con entradas nuevas y repetido sin cambios, por tamaño de almacén"""
+    resultados = {}
+    for tamano in opciones.tamanos_almacen:
+        directorio = tempfile.mkdtemp(prefix='boe_bench_')
+        try:
+            monitor = _crear_monitor(directorio, servidor.url_rss(opciones.lote_actualizacion),
+                                     opciones.almacen)
+            try:
+                poblar_almacen(monitor.almacen, tamano)
+                entradas = monitor.obtener_nuevas_entradas()
+                for entrada in entradas:
+                    entrada['link'] = monitor.convertir_url_a_xml(entrada['link'])
+                with Medicion(memoria) as nuevas:
+                    monitor.actualizar_datos_boe([dict(entrada) for entrada in entradas], notificar=False)
+                with Medicion(memoria) as sin_cambios:
+                    monitor.actualizar_datos_boe([dict(entrada) for entrada in entradas], notificar=False)
+                resultados[str(tamano)] = {
+                    'nuevas': _resultado(nuevas, len(entradas)),
+                    'sin_cambios': _resultado(sin_cambios, len(entradas))
+                }
+            finally:
+                monitor.cerrar()
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def version_actual():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocida'
+
+
+def ejecutar(opciones):
+    from utils.logger import configurar_logs
+
+    directorio = tempfile.mkdtemp(prefix='boe_bench_')
+    configurar_logs({'nivel': 'WARNING', 'archivo': os.path.join(directorio, 'benchmark.log')})
+    resultados = {
+        'version': version_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {clave: valor for clave, valor in vars(opciones).items()
+                       if clave not in ('comparar', 'grabar')},
+        'etapas': {}
+    }
+    etapas = resultados['etapas']
+    memoria = not opciones.sin_memoria
+    try:
+        with ServidorFixtures(opciones.fixtures, opciones.entradas, opciones.tamano_documento_kb,
+                              opciones.grandes_cada, opciones.tamano_grande_kb,
+                              opciones.latencia) as servidor:
+            monitor = _crear_monitor(directorio, servidor.url_rss(), opciones.almacen)
+            try:
+                entradas, etapas['obtener_nuevas_entradas'] = medir_rss(
+                    monitor, opciones.repeticiones, memoria)
+                print(f"RSS: {len(entradas)} entradas")
+
+                for entrada in entradas:
+                    entrada['link'] = monitor.convertir_url_a_xml(entrada['link'])
+                urls = [entrada['link'] for entrada in entradas[:opciones.documentos]]
+                contenidos, etapas['obtener_contenido_xml'], etapas['parsear_xml'] = medir_xml(
+                    monitor, urls, memoria)
+                print(f"XML: {len(urls)} documentos")
+            finally:
+                monitor.cerrar()
+
+            etapas['filtrar_entradas'] = medir_filtrado(
+                entradas[:opciones.documentos], contenidos, opciones.repeticiones, memoria)
+            etapas['clasificar_contenidos_xml'] = medir_clasificacion(
+                servidor, [{clave: valor for clave, valor in entrada.items() if clave != 'contenido_xml'}
+                           for entrada in entradas[:opciones.documentos]], opciones, memoria)
+
+            etapas['actualizar_datos_boe'] = medir_actualizacion(servidor, opciones, memoria)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def guardar_resultados(resultados, directorio=DIRECTORIO_RESULTADOS):
+    Path(directorio).mkdir(parents=True, exist_ok=True)
+    marca = datetime.now().strftime('%Y%m%d-%H%M%S')
+    ruta = Path(directorio) / f"{marca}_{resultados['version']}.json"
+    ruta.write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding='utf-8')
+    return ruta
+
+
+def _aplanar(etapas, prefijo=''):
+    """{'a': {'b': {'duracion_s': ...}}} → {'a.b': {...}}"""
+    planas = {}
+    for nombre, valor in etapas.items():
+        if 'duracion_s' in valor:
+            planas[prefijo + nombre] = valor
+        else:
+            planas.update(_aplanar(valor, f"{prefijo}{nombre}."))
+    return planas
+
+
+def mostrar(resultados, anteriores=None):
+    actuales = _aplanar(resultados['etapas'])
+    previas = _aplanar(anteriores['etapas']) if anteriores else {}
+    print(f"\nVersión {resultados['version']}"
+          + (f" comparada con {anteriores['version']}" if anteriores else ''))
+    print(f"{'Etapa':45} {'s':>9} {'elem/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'MB pico':>8}  Δ elem/s")
+    for nombre, valor in actuales.items():
+        latencia = valor.get('latencia', {})
+        cambio = ''
+        if valor['por_segundo'] and previas.get(nombre, {}).get('por_segundo'):
+            cambio = f"{(valor['por_segundo'] / previas[nombre]['por_segundo'] - 1) * 100:+.1f}%"
+        print(f"{nombre:45} {valor['duracion_s']:>9.3f} {valor['por_segundo'] or 0:>10.1f} "
+              f"{latencia.get('p50_ms', '-'):>9} {latencia.get('p95_ms', '-'):>9} "
+              f"{valor['pico_memoria_mb'] if valor['pico_memoria_mb'] is not None else '-':>8}  {cambio}")
+
+
+def _lista_enteros(texto):
+    return [int(valor) for valor in texto.split(',') if valor]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline del monitor del BOE")
+    parser.add_argument("--entradas", type=int, default=2000, help="Entradas del RSS sintético")
+    parser.add_argument("--documentos", type=int, default=200, help="Documentos XML a descargar y parsear")
+    parser.add_argument("--tamano-documento-kb", type=int, default=32)
+    parser.add_argument("--grandes-cada", type=int, default=50,
+                        help="Uno de cada N documentos es grande (0 para ninguno)")
+    parser.add_argument("--tamano-grande-kb", type=int, default=4096)
+    parser.add_argument("--tamanos-almacen", type=_lista_enteros, default=[0, 10000, 50000])
+    parser.add_argument("--lote-actualizacion", type=int, default=200,
+                        help="Entradas nuevas por llamada a actualizar_datos_boe")
+    parser.add_argument("--almacen", choices=['sqlite', 'diario'], default='sqlite')
+    parser.add_argument("--procesos", type=_lista_enteros, default=[0, os.cpu_count() or 1],
+                        help="Procesos auxiliares a comparar en la clasificación (0 = hilos)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia simulada del servidor (s)")
+    parser.add_argument("--fixtures", help="Directorio con fixtures grabados (rss/, xml/)")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir memoria (tracemalloc ralentiza)")
+    parser.add_argument("--salida", default=DIRECTORIO_RESULTADOS)
+    parser.add_argument("--comparar", help="Resultados JSON anteriores con los que comparar")
+    parser.add_argument("--grabar", metavar="DIRECTORIO", help="Graba fixtures reales de boe.es y termina")
+    opciones = parser.parse_args()
+
+    if opciones.grabar:
+        grabar_fixtures(opciones.grabar)
+    else:
+        resultados = ejecutar(opciones)
+        ruta = guardar_resultados(resultados, opciones.salida)
+        anteriores = None
+        if opciones.comparar:
+            with open(opciones.comparar, 'r', encoding='utf-8') as f:
+                anteriores = json.load(f)
+        mostrar(resultados, anteriores)
+        print(f"\nResultados guardados en {ruta}")
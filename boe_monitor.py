@@ -1,164 +1,424 @@
+import copy
 import json
 import os
-import feedparser
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
-import hashlib
-from datetime import datetime
-import re
 from utils.email_sender import EmailSender
+from utils.notificaciones import ColaNotificaciones
 from utils.logger import BOELogger
-import xml.etree.ElementTree as ET
-from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.concurrencia import LimitadorPorHost, RegistroDescargas
+from utils.cache_http import CacheHTTP, NO_MODIFICADO
+from utils.almacen import AlmacenBOE, codificar_boe_id, extraer_boe_id
+from utils.almacen_diario import AlmacenDiario
+from utils.huellas import calcular_huella, campos_modificados, huella_rss, rss_modificada
+from utils.parser_xml import parsear_documento, TAMANO_FRAGMENTO
+from utils.parser_rss import leer_entradas_rss
+from utils.indice_textual import IndiceTextual
+from utils.metricas import METRICAS
+from utils.cliente_http import ClienteHTTP, PENDIENTE, ESTADOS_REINTENTABLES
+from utils.pendientes import ColaPendientes
+from utils.blobs import AlmacenBlobs
+from utils.procesos import ProcesadorDocumentos, DocumentoCrudo
+from utils.clasificador import ClasificadorEntradas, DEPARTAMENTO_POR_DEFECTO
+from utils.versiones import HistorialVersiones
+from utils.modelo import IndiceHuellas, codigo_entrada
+from utils.indice_ids import IndiceIdsConocidos
 
 class BOEKitMonitor:
-    def __init__(self, rss_url, data_file, email_config):
+    def __init__(self, rss_url, data_file, email_config, max_descargas=8,
+                 max_por_host=4, intervalo_por_host=0.0, tipo_almacen='sqlite',
+                 modo_notificacion='resumen', revalidar_cada=24 * 3600, opciones_http=None,
+                 procesos=0, clasificador=None):
         self.rss_url = rss_url
         self.data_file = data_file
         self.email_config = email_config
         self.logger = BOELogger()
-        self.session = requests.Session()
+        self.email_sender = EmailSender(email_config)
+        self.notificaciones = ColaNotificaciones(self.email_sender, modo_notificacion)
+        self.max_descargas = max_descargas
+        # Segundos tras los que se vuelve a pedir el XML de una entrada sin cambios
+        # en el RSS (None desactiva la revisión periódica)
+        self.revalidar_cada = revalidar_cada
+        self.limitador = LimitadorPorHost(max_por_host, intervalo_por_host)
+        # Un 304 solo vale para quien pidió el documento de forma condicional
+        self.descargas = RegistroDescargas(no_reutilizar=(PENDIENTE, NO_MODIFICADO))
+        self.indice_huellas = None
+        # Con procesos > 0 el parseo y la evaluación de los XML se reparten entre procesos
+        self.procesador = ProcesadorDocumentos(procesos) if procesos else None
+        # Categoría, departamento estimado y relevancia de las entradas (sin perfiles: General / No especificado)
+        self.clasificador = clasificador or ClasificadorEntradas()
+        self._lock_almacen = threading.Lock()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        # Reintentos, espera exponencial y cortacircuitos para boe.es (config "http")
+        self.cliente = ClienteHTTP(max_conexiones=max_descargas, **(opciones_http or {}))
+        self.session = self.cliente.session
+        self.pendientes = ColaPendientes(
+            os.path.join(os.path.dirname(data_file), 'pendientes.json'))
+        self.cache_http = CacheHTTP(
+            os.path.join(os.path.dirname(data_file), 'cache_http.json'))
+        self.almacen = self._abrir_almacen(data_file, tipo_almacen)
+        # Ids BOE ya almacenados, en un archivo ordenado que se consulta con mmap
+        self.indice_ids = self._abrir_indice_ids(data_file)
+        self.indice_textual = IndiceTextual(os.path.splitext(data_file)[0] + '_fts.db')
+        # Versiones de cada documento guardadas como deltas respecto a la anterior
+        self.historial = HistorialVersiones(os.path.splitext(data_file)[0] + '_versiones.db')
+
+    def _abrir_almacen(self, data_file, tipo_almacen):
+        """Abre el almacén junto al archivo de datos e importa el JSON antiguo si está vacío.
+
+        tipo_almacen: 'sqlite' (base indexada) o 'diario' (JSON Lines de solo anexado).
+        """
+        base = os.path.splitext(data_file)[0]
+        # Los textos de los documentos se guardan comprimidos y deduplicados aparte
+        blobs = AlmacenBlobs(base + '_blobs')
+        if tipo_almacen == 'diario':
+            almacen = AlmacenDiario(base + '_diario', blobs=blobs)
+        else:
+            almacen = AlmacenBOE(base + '.db', blobs=blobs)
+        if almacen.contar() == 0 and os.path.exists(data_file):
+            try:
+                importadas = almacen.importar_json(data_file)
+                self.logger.info(f"📥 Importadas {importadas} entradas desde {data_file}")
+            except (ValueError, OSError) as e:
+                self.logger.warning(f"⚠️ No se pudo importar {data_file}: {str(e)}")
+        return almacen
+
+    def _abrir_indice_ids(self, data_file):
+        """Abre el índice de ids conocidos y lo reconstruye si no corresponde al almacén"""
+        indice = IndiceIdsConocidos(os.path.splitext(data_file)[0] + '_ids.idx')
+        total = self.almacen.contar()
+        if indice.desfasado(total):
+            indice.reconstruir(self.almacen.codigos_boe(), total)
+            if total:
+                self.logger.info(f"🗂️ Índice de ids conocidos reconstruido: {len(indice)} ids BOE")
+        return indice
+
+    def activar_indice_memoria(self, maximo=50000):
+        """Mantiene en memoria las huellas de los ids vistos recientemente (modo demonio)"""
+        if self.indice_huellas is None:
+            self.indice_huellas = IndiceHuellas(maximo)
+
+    def _posiblemente_conocido(self, id_entrada):
+        """False si el id BOE de la entrada no está en el índice de ids conocidos (entrada nueva)"""
+        codigo = codificar_boe_id(extraer_boe_id(id_entrada))
+        return codigo is None or codigo in self.indice_ids
+
+    def _obtener_huellas(self, ids):
+        """Huellas de las entradas existentes, usando el índice en memoria si está activo.
+
+        Las entradas cuyo id BOE no está en el índice de ids conocidos son nuevas
+        y no se buscan en el almacén.
+        """
+        ids = list(ids)
+        huellas = self.indice_huellas.obtener(ids) if self.indice_huellas is not None else {}
+        # Otro proceso (p. ej. un cron sobre el mismo almacén) puede haber guardado entradas
+        self.indice_ids.refrescar()
+        faltan = [id_entrada for id_entrada in ids
+                  if id_entrada not in huellas and self._posiblemente_conocido(id_entrada)]
+        if faltan:
+            leidas = self.almacen.obtener_huellas(faltan)
+            if self.indice_huellas is not None:
+                self.indice_huellas.recordar(leidas.items())
+            huellas.update(leidas)
+        return huellas
+
+    def ids_conocidos(self, ids):
+        """Devuelve el subconjunto de ids que ya están en el almacén"""
+        return set(self._obtener_huellas(ids))
+
+    def recuperar_pendientes(self):
+        """Devuelve (y saca de la cola) las entradas pendientes si boe.es vuelve a estar disponible"""
+        if not len(self.pendientes) or not self.cliente.disponible(self.rss_url):
+            return []
+        entradas = self.pendientes.extraer()
+        self.logger.info(f"🔁 Reanudando {len(entradas)} entradas pendientes de descarga")
+        return entradas
+
+    def terminar_ciclo(self):
+        """Al final de cada ciclo: escribe la caché de validadores y olvida las descargas compartidas"""
+        self.cache_http.guardar()
+        self.descargas.limpiar()
+
+    def cerrar(self):
+        """Detiene los procesos auxiliares y cierra los almacenes (al terminar la ejecución)"""
+        self.cache_http.guardar()
+        if self.procesador:
+            self.procesador.cerrar()
+        self.almacen.cerrar()
+        self.indice_ids.cerrar()
+        self.indice_textual.cerrar()
+        self.historial.cerrar()
+
+    def clonar_para_feed(self, rss_url):
+        """Crea un monitor para otro feed que comparte sesión HTTP, cachés, almacén y descargas"""
+        monitor = copy.copy(self)
+        monitor.rss_url = rss_url
+        monitor.notificaciones = ColaNotificaciones(self.email_sender, self.notificaciones.modo)
+        return monitor
 
     def procesar_entrada_boe(self, entrada_rss):
         """Procesa una entrada del RSS del BOE y la convierte al formato requerido"""
-        return {
+        return self.procesar_entradas_boe([entrada_rss])[0]
+
+    def procesar_entradas_boe(self, entradas_rss):
+        """Convierte un lote de entradas del RSS y las clasifica todas a la vez"""
+        entradas = [{
             "id": entrada_rss.get('id', ''),
             "titulo": entrada_rss.get('title', ''),
             "descripcion": entrada_rss.get('summary', ''),
             "link": entrada_rss.get('link', ''),
             "fecha_publicacion": entrada_rss.get('published', ''),
-            "categoria": self._extraer_categoria(entrada_rss.get('title', '')),
-            "departamento": self._extraer_departamento(entrada_rss.get('summary', '')),
+            "categoria": None,
+            "departamento": DEPARTAMENTO_POR_DEFECTO,
             "estado": "pendiente"
-        }
+        } for entrada_rss in entradas_rss]
+        return self.clasificador.clasificar_entradas(entradas)
 
-    def actualizar_datos_boe(self, nuevas_entradas):
-        """Actualiza el archivo JSON con nuevas entradas del BOE"""
+    @METRICAS.medir('actualizacion')
+    def actualizar_datos_boe(self, nuevas_entradas, notificar=True):
+        """Actualiza el almacén con nuevas entradas del BOE.
+
+        Con notificar=True encola un aviso por cada entrada nueva o modificada;
+        se entregan juntos con enviar_notificaciones() al terminar la ejecución.
+        """
         try:
             self.logger.start_operation("Actualización de datos BOE")
             
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
+            self.logger.info(f"📊 Procesando {len(nuevas_entradas)} entradas potenciales")
             
-            entradas_existentes = {entrada['id']: entrada for entrada in datos['ultimas_entradas']}
-            entradas_nuevas_anadidas = 0
-            entradas_actualizadas = 0
+            # Solo se descarga el XML de entradas nuevas, con metadatos cambiados
+            # o pendientes de revisión periódica
+            existentes = self._obtener_huellas(entrada['id'] for entrada in nuevas_entradas)
+            nuevas_entradas = self.planificar_descargas(nuevas_entradas, existentes)
+            ids = [entrada['id'] for entrada in nuevas_entradas]
             
-            self.logger.info(f"📊 Procesando {len(nuevas_entradas)} entradas potenciales")
+            # Descargar en paralelo el contenido XML de las entradas planificadas; las
+            # ya almacenadas se piden de forma condicional (ETag / Last-Modified)
+            contenidos = self.obtener_contenidos_xml(
+                [entrada['link'] for entrada in nuevas_entradas],
+                condicionales={entrada['link'] for entrada in nuevas_entradas
+                               if entrada['id'] in existentes})
             
-            for entrada_nueva in nuevas_entradas:
-                # Obtener contenido XML
-                contenido_xml = self.obtener_contenido_xml(entrada_nueva['link'])
-                if contenido_xml:
-                    entrada_nueva['contenido_xml'] = contenido_xml
-                    
-                if entrada_nueva['id'] not in entradas_existentes:
-                    datos['ultimas_entradas'].append(entrada_nueva)
-                    entradas_nuevas_anadidas += 1
-                    self.logger.info(f"📥 Nueva entrada: {entrada_nueva['titulo'][:100]}...")
-                else:
-                    entrada_existente = entradas_existentes[entrada_nueva['id']]
-                    if self._hay_cambios_en_entrada(entrada_existente, entrada_nueva):
-                        idx = next(i for i, e in enumerate(datos['ultimas_entradas']) 
-                                 if e['id'] == entrada_nueva['id'])
-                        datos['ultimas_entradas'][idx] = entrada_nueva
-                        entradas_actualizadas += 1
-                        self.logger.info(f"🔄 Actualización: {entrada_nueva['titulo'][:100]}...")
+            # Las descargas fallidas por problemas transitorios no se guardan sin
+            # contenido: se reintentan en la próxima ejecución
+            pendientes = [entrada for entrada in nuevas_entradas
+                          if contenidos.get(entrada['link']) is PENDIENTE]
+            if pendientes:
+                self.pendientes.agregar(pendientes)
+                nuevas_entradas = [entrada for entrada in nuevas_entradas
+                                   if contenidos.get(entrada['link']) is not PENDIENTE]
+                ids = [entrada['id'] for entrada in nuevas_entradas]
+                self.logger.warning(f"⏸️ {len(pendientes)} entradas quedan pendientes de descarga")
             
-            # Actualizar estadísticas
-            datos['estadisticas']['total_entradas'] = len(datos['ultimas_entradas'])
-            datos['estadisticas']['entradas_procesadas'] += entradas_nuevas_anadidas
-            datos['fecha_ultima_actualizacion'] = datetime.now().isoformat()
+            # Otros feeds pueden compartir el almacén: la comparación y el guardado
+            # se hacen en exclusión mutua. Solo se cargan huellas, no el texto.
+            with self._lock_almacen, METRICAS.cronometro('guardado'):
+                entradas_existentes = self._obtener_huellas(ids)
+                entradas_a_guardar, revisadas = self._fusionar_entradas(
+                    nuevas_entradas, contenidos, entradas_existentes)
+                entradas_nuevas_anadidas = sum(1 for _, es_nueva in entradas_a_guardar if es_nueva)
+                entradas_actualizadas = len(entradas_a_guardar) - entradas_nuevas_anadidas
+                
+                # Guardar solo las entradas nuevas o modificadas y actualizar estadísticas
+                self.almacen.guardar_entradas(entrada for entrada, _ in entradas_a_guardar)
+                self.indice_textual.indexar(entrada for entrada, _ in entradas_a_guardar)
+                versionadas = self.historial.registrar_entradas(
+                    entrada for entrada, _ in entradas_a_guardar)
+                instante = time.time()
+                self.almacen.marcar_revisadas(revisadas, instante)
+                if self.indice_huellas is not None:
+                    self.indice_huellas.recordar(
+                        (entrada['id'], entrada['huella']) for entrada, _ in entradas_a_guardar)
+                    self.indice_huellas.marcar_revisadas(revisadas, instante)
+                estadisticas = self.almacen.registrar_actualizacion(entradas_nuevas_anadidas)
+                self.indice_ids.agregar(codigo_entrada(entrada) for entrada, _ in entradas_a_guardar)
+                self.indice_ids.guardar(self.almacen.contar())
+            METRICAS.contar('entradas_guardadas_total', entradas_nuevas_anadidas, tipo='nueva')
+            METRICAS.contar('entradas_guardadas_total', entradas_actualizadas, tipo='actualizada')
+            METRICAS.contar('entradas_revisadas_total', len(revisadas))
+            METRICAS.contar('versiones_registradas_total', len(versionadas))
+            if notificar:
+                self._encolar_avisos(entradas_a_guardar, versionadas)
             
             resumen = f"""
             📋 Resumen de actualización:
             ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             ➕ Nuevas entradas: {entradas_nuevas_anadidas}
             🔄 Actualizaciones: {entradas_actualizadas}
-            📚 Total en sistema: {datos['estadisticas']['total_entradas']}
-            🕒 Última actualización: {datos['fecha_ultima_actualizacion']}
+            📚 Total en sistema: {estadisticas['total_entradas']}
+            🕒 Última actualización: {estadisticas['fecha_ultima_actualizacion']}
             ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             """
             self.logger.info(resumen)
             
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(datos, f, ensure_ascii=False, indent=4)
-            
             self.logger.success("Actualización completada exitosamente")
             self.logger.end_operation("Actualización de datos BOE")
             return True
             
         except Exception as e:
+            METRICAS.contar('actualizacion_errores_total')
             self.logger.error(f"❌ Error en actualización: {str(e)}")
             return False
 
-    def _hay_cambios_en_entrada(self, entrada_existente, entrada_nueva):
-        """Compara una entrada existente con una nueva para detectar cambios"""
-        # Añadir comparación de contenido XML si está disponible
-        if ('contenido_xml' in entrada_nueva and 
-            ('contenido_xml' not in entrada_existente or 
-             entrada_existente['contenido_xml'] != entrada_nueva['contenido_xml'])):
-            self.logger.info("📄 Detectados cambios en el contenido XML")
+    def _encolar_avisos(self, entradas_a_guardar, versionadas):
+        """Añade a la cola de notificaciones un aviso por entrada nueva o modificada.
+
+        Los avisos de entradas modificadas con una versión nueva incluyen el diff
+        respecto a la anterior.
+        """
+        for entrada, es_nueva in entradas_a_guardar:
+            asunto = "Nueva disposición" if es_nueva else "Disposición modificada"
+            mensaje = self._formatear_aviso(entrada)
+            if not es_nueva and entrada['id'] in versionadas:
+                diferencia = self.historial.diferencia(entrada['id'], versionadas[entrada['id']])
+                if diferencia:
+                    mensaje += f"\n\nCambios en el texto:\n{diferencia}"
+            self.notificaciones.agregar(f"{asunto}: {entrada['titulo'][:100]}", mensaje)
+
+    def _formatear_aviso(self, entrada):
+        # El departamento del documento (XML) o el del RSS, nunca el estimado por el clasificador
+        departamento = ((entrada.get('contenido_xml') or {}).get('departamento')
+                        or entrada.get('departamento') or DEPARTAMENTO_POR_DEFECTO)
+        lineas = [
+            entrada['titulo'],
+            "",
+            f"Departamento: {departamento}",
+            f"Categoría: {entrada.get('categoria') or 'General'}",
+            f"Publicación: {entrada.get('fecha_publicacion', '')}",
+            f"Enlace: {entrada.get('link', '')}"
+        ]
+        if entrada.get('coincidencias'):
+            lineas.append(f"Coincidencias: {', '.join(map(str, entrada['coincidencias']))}")
+        return '\n'.join(lineas)
+
+    def enviar_notificaciones(self):
+        """Envía en un solo lote los avisos acumulados. Devuelve los correos enviados"""
+        avisos = len(self.notificaciones)
+        if not avisos:
+            return 0
+        self.logger.info(f"📧 Enviando {avisos} avisos de cambios en el BOE")
+        return self.notificaciones.enviar(
+            "BOE Monitor con cambios",
+            f"Se han detectado {avisos} disposiciones nuevas o modificadas en {self.rss_url}.")
+
+    def planificar_descargas(self, entradas, huellas_existentes):
+        """Selecciona las entradas cuyo XML hay que descargar.
+
+        Se descargan las entradas nuevas, las que han cambiado de metadatos en el
+        RSS y las que no se revisan desde hace más de `revalidar_cada` segundos.
+        """
+        ahora = time.time()
+        planificadas = []
+        nuevas = cambiadas = revisiones = 0
+        for entrada in entradas:
+            existente = huellas_existentes.get(entrada['id'])
+            if existente is None:
+                nuevas += 1
+            elif rss_modificada(existente['rss'], huella_rss(entrada)):
+                cambiadas += 1
+            elif (self.revalidar_cada is not None
+                  and ahora - existente.get('revisado', 0) >= self.revalidar_cada):
+                revisiones += 1
+            else:
+                continue
+            planificadas.append(entrada)
+        self.logger.info(f"🗓️ Plan de descargas: {nuevas} nuevas, {cambiadas} con metadatos cambiados, "
+                         f"{revisiones} revisiones periódicas, "
+                         f"{len(entradas) - len(planificadas)} omitidas sin cambios")
+        return planificadas
+
+    def _fusionar_entradas(self, nuevas_entradas, contenidos, entradas_existentes):
+        """Devuelve ([(entrada, es_nueva)] nuevas o modificadas, [ids revisados sin cambios])"""
+        resultado = []
+        revisadas = []
+        # 304 de entradas con metadatos del RSS cambiados: el documento guardado sigue vigente
+        huellas_rss = {entrada['id']: huella_rss(entrada) for entrada in nuevas_entradas
+                       if contenidos.get(entrada['link']) is NO_MODIFICADO
+                       and entrada['id'] in entradas_existentes}
+        guardadas = self.almacen.obtener_varias(
+            id_entrada for id_entrada, huella in huellas_rss.items()
+            if rss_modificada(entradas_existentes[id_entrada]['rss'], huella))
+        for entrada_nueva in nuevas_entradas:
+            contenido_xml = contenidos.get(entrada_nueva['link'])
+            if contenido_xml is NO_MODIFICADO:
+                # 304: el documento no ha cambiado desde la última descarga
+                guardada = guardadas.get(entrada_nueva['id'])
+                if guardada is not None:
+                    # Se guardan los metadatos nuevos del RSS con el XML ya almacenado
+                    if guardada.get('contenido_xml'):
+                        entrada_nueva['contenido_xml'] = guardada['contenido_xml']
+                    entrada_nueva['huella'] = {
+                        'rss': huellas_rss[entrada_nueva['id']],
+                        'xml': entradas_existentes[entrada_nueva['id']].get('xml'),
+                        'revisado': time.time()
+                    }
+                    resultado.append((entrada_nueva, False))
+                    self.logger.debug("🔄 Actualización de metadatos: %.100s...", entrada_nueva['titulo'])
+                elif entrada_nueva['id'] in entradas_existentes:
+                    revisadas.append(entrada_nueva['id'])
+                continue
+            if contenido_xml:
+                entrada_nueva['contenido_xml'] = contenido_xml
+            entrada_nueva['huella'] = calcular_huella(entrada_nueva)
+            if contenido_xml:
+                # Si la descarga falla no se anota la revisión y se reintenta en la próxima ejecución
+                entrada_nueva['huella']['revisado'] = time.time()
+                
+            if entrada_nueva['id'] not in entradas_existentes:
+                resultado.append((entrada_nueva, True))
+                entradas_existentes[entrada_nueva['id']] = entrada_nueva['huella']
+                self.logger.debug("📥 Nueva entrada: %.100s...", entrada_nueva['titulo'])
+            else:
+                entrada_existente = entradas_existentes[entrada_nueva['id']]
+                if self._hay_cambios_en_entrada(entrada_existente, entrada_nueva):
+                    resultado.append((entrada_nueva, False))
+                    self.logger.debug("🔄 Actualización: %.100s...", entrada_nueva['titulo'])
+                elif contenido_xml:
+                    revisadas.append(entrada_nueva['id'])
+        return resultado, revisadas
+
+    def _hay_cambios_en_entrada(self, huella_existente, entrada_nueva):
+        """Compara la huella almacenada con la de la entrada nueva para detectar cambios"""
+        cambios = campos_modificados(huella_existente, entrada_nueva['huella'])
+        if cambios:
+            self.logger.debug("📄 Cambios detectados en: %s", cambios)
             return True
-            
-        campos_a_comparar = ['titulo', 'descripcion', 'link', 'fecha_publicacion', 
-                           'categoria', 'departamento']
-        
-        for campo in campos_a_comparar:
-            if entrada_existente.get(campo) != entrada_nueva.get(campo):
-                print(f"Cambio detectado en campo '{campo}':")
-                print(f"- Anterior: {entrada_existente.get(campo)}")
-                print(f"- Nuevo: {entrada_nueva.get(campo)}")
-                return True
         return False
 
+    @METRICAS.medir('rss')
     def obtener_nuevas_entradas(self):
         """Obtiene nuevas entradas del RSS del BOE"""
         self.logger.info(f"Intentando obtener contenido desde: {self.rss_url}")
-        import feedparser
         
         try:
-            feed = feedparser.parse(self.rss_url)
-            if hasattr(feed, 'status') and feed.status == 200:
-                self.logger.info(f"Respuesta HTTP: {feed.status}")
-                nuevas_entradas = []
-                for entrada in feed.entries:
-                    entrada_procesada = self.procesar_entrada_boe(entrada)
-                    nuevas_entradas.append(entrada_procesada)
-                self.logger.info(f"Se obtuvieron {len(nuevas_entradas)} entradas del feed")
-                return nuevas_entradas
-            else:
-                self.logger.error("Error al obtener el feed RSS")
-                return []
+            cabeceras = {**self.headers, **self.cache_http.cabeceras_condicionales(self.rss_url)}
+            with self.cliente.get(self.rss_url, headers=cabeceras, timeout=10, stream=True) as response:
+                self.logger.info(f"Respuesta HTTP: {response.status_code}")
+                METRICAS.contar('rss_respuestas_total', estado=response.status_code)
+                if response.status_code == 304:
+                    self.logger.info("📭 El feed RSS no ha cambiado desde la última consulta")
+                    return []
+                if response.status_code != 200:
+                    self.logger.error("Error al obtener el feed RSS")
+                    return []
+                # El feed se parsea a medida que llega (feedparser solo si no es un RSS 2.0 del BOE)
+                nuevas_entradas = self.procesar_entradas_boe(
+                    leer_entradas_rss(response.iter_content(TAMANO_FRAGMENTO)))
+                self.cache_http.registrar(self.rss_url, response)
+            METRICAS.contar('rss_entradas_total', len(nuevas_entradas))
+            self.logger.info(f"Se obtuvieron {len(nuevas_entradas)} entradas del feed")
+            return nuevas_entradas
         except Exception as e:
+            METRICAS.contar('rss_errores_total')
             self.logger.error(f"Error al obtener entradas del RSS: {str(e)}")
             return []
 
-    def _extraer_categoria(self, titulo):
-        """Extrae la categoría del título de la entrada"""
-        # Implementar lógica de extracción de categoría
-        return "General"  # Por defecto
-
-    def _extraer_departamento(self, descripcion):
-        """Extrae el departamento de la descripción"""
-        # Implementar lógica de extracción de departamento
-        return "No especificado"  # Por defecto
-
-    def obtener_contenido(self, link):
-        try:
-            logging.info(f"Intentando obtener contenido desde: {link}")
-            response = requests.get(link)
-            response.raise_for_status()
-            logging.info(f"Respuesta HTTP: {response.status_code}")
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error al obtener el contenido: {e}")
-            return None
-
     def parsear_rss(self, contenido_xml):
+        import feedparser
         try:
             feed = feedparser.parse(contenido_xml)
             articulos = []
@@ -198,85 +458,23 @@ class BOEKitMonitor:
         except Exception as e:
             logging.error(f"Error al persistir los datos: {e}")
 
-    def monitorear(self):
-        feed = feedparser.parse(self.rss_url)
-        cambios_detectados = False
-        
-        for entrada in feed.entries:
-            contenido_actual = self.obtener_contenido(entrada.link)
-            
-            if not self.es_proyecto_relevante(entrada.title, contenido_actual):
-                continue
-                
-            categoria = self.clasificar_categoria(entrada.title, contenido_actual)
-            if not categoria:
-                continue
-
-            proyecto_id = entrada.id
-            hash_actual = hashlib.md5(contenido_actual.encode()).hexdigest()
-            terminos_actuales = self.obtener_terminos(contenido_actual)
-            
-            if proyecto_id not in self.datos[categoria]:
-                self.datos[categoria][proyecto_id] = {
-                    'titulo': entrada.title,
-                    'contenido': contenido_actual,
-                    'hash': hash_actual,
-                    'url': entrada.link,
-                    'terminos': terminos_actuales,
-                    'fecha_deteccion': datetime.now().isoformat(),
-                    'ultima_actualizacion': datetime.now().isoformat()
-                }
-                cambios_detectados = True
-                self.enviar_email(
-                    f"Nuevo Proyecto {categoria.replace('_', ' ').title()} Detectado",
-                    self.formatear_mensaje_cambios(categoria, entrada.title, terminos_actuales, entrada.link)
-                )
-            
-            elif self.datos[categoria][proyecto_id]['hash'] != hash_actual or self.datos[categoria][proyecto_id]['terminos'] != terminos_actuales:
-                cambios_detectados = True
-                self.enviar_email(
-                    f"Cambios en Proyecto {categoria.replace('_', ' ').title()}",
-                    self.formatear_mensaje_cambios(categoria, entrada.title, terminos_actuales, entrada.link)
-                )
-                
-                self.datos[categoria][proyecto_id].update({
-                    'contenido': contenido_actual,
-                    'hash': hash_actual,
-                    'terminos': terminos_actuales,
-                    'ultima_actualizacion': datetime.now().isoformat()
-                })
-            
-            self._guardar_datos()
-        
-        if cambios_detectados:
-            self.enviar_email(
-                "BOE Monitor con cambios !!!",
-                "Se han detectado cambios en los proyectos. Revisa los correos individuales para más detalles."
-            )
-        else:
-            self.enviar_email(
-                "BOE Monitor sin cambios Santi",
-                "Lo siento Santi. Hoy no hay nada nuevo Santi..... es cosa de esperar un poco"
-            )
-
     def enviar_email(self, asunto, contenido):
         self.email_sender.send_email(asunto, contenido) 
 
     def mostrar_estadisticas(self):
         """Muestra estadísticas detalladas del monitoreo"""
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                datos = json.load(f)
+            estadisticas = self.almacen.estadisticas()
             
             print("\nEstadísticas del monitor BOE:")
             print("-" * 40)
-            print(f"Total de entradas: {datos['estadisticas']['total_entradas']}")
-            print(f"Entradas procesadas: {datos['estadisticas']['entradas_procesadas']}")
-            print(f"Última actualización: {datos['fecha_ultima_actualizacion']}")
+            print(f"Total de entradas: {estadisticas['total_entradas']}")
+            print(f"Entradas procesadas: {estadisticas['entradas_procesadas']}")
+            print(f"Última actualización: {estadisticas['fecha_ultima_actualizacion']}")
             
             # Mostrar últimas 5 entradas
             print("\nÚltimas 5 entradas:")
-            for entrada in datos['ultimas_entradas'][-5:]:
+            for entrada in self.almacen.ultimas(5):
                 print(f"- {entrada['fecha_publicacion']}: {entrada['titulo'][:100]}...")
             
             return True
@@ -294,49 +492,161 @@ class BOEKitMonitor:
             self.logger.error(f"❌ Error al convertir URL a XML: {str(e)}")
             return url_txt
 
-    def obtener_contenido_xml(self, url):
-        """Obtiene y parsea el contenido XML de una URL del BOE"""
+    @METRICAS.medir('xml_descarga')
+    def obtener_contenido_xml(self, url, condicional=False):
+        """Obtiene y parsea el contenido XML de una URL del BOE.
+
+        Con condicional=True se envían los validadores guardados y se devuelve
+        NO_MODIFICADO si el servidor responde 304. Devuelve PENDIENTE si boe.es
+        no está disponible (tras los reintentos o con el circuito abierto).
+        """
         try:
-            self.logger.info(f"🔍 Obteniendo contenido XML de: {url}")
+            self.logger.debug("🔍 Obteniendo contenido XML de: %s", url)
             
             # Convertir URL a formato XML si es necesario
             url_xml = self.convertir_url_a_xml(url)
             
-            response = self.session.get(url_xml, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                self.logger.success(f"Contenido XML obtenido correctamente")
-                return self.parsear_xml(response.text)
-            else:
+            cabeceras = self.headers
+            if condicional:
+                cabeceras = {**self.headers, **self.cache_http.cabeceras_condicionales(url_xml)}
+            with self.cliente.get(url_xml, headers=cabeceras, timeout=10,
+                                  stream=True) as response:
+                METRICAS.contar('xml_respuestas_total', estado=response.status_code)
+                if response.status_code == 304:
+                    return NO_MODIFICADO
+                if response.status_code == 200:
+                    if self.procesador:
+                        # Se parsea después, por lotes, en los procesos auxiliares
+                        return DocumentoCrudo(response.content, response.headers)
+                    # El cuerpo se parsea a medida que llega, sin cargarlo entero
+                    contenido = self.parsear_xml(response.iter_content(TAMANO_FRAGMENTO))
+                    if contenido:
+                        self.cache_http.registrar(url_xml, response)
+                    return contenido
                 self.logger.error(f"❌ Error al obtener XML. Status: {response.status_code}")
+                if response.status_code in ESTADOS_REINTENTABLES:
+                    return PENDIENTE
                 return None
+        except requests.RequestException as e:
+            METRICAS.contar('xml_descarga_errores_total')
+            self.logger.warning(f"⏸️ Descarga aplazada de {url}: {str(e)}")
+            return PENDIENTE
         except Exception as e:
+            METRICAS.contar('xml_descarga_errores_total')
             self.logger.error(f"❌ Error al obtener contenido XML: {str(e)}")
             return None
 
+    def obtener_contenidos_xml(self, urls, condicionales=()):
+        """Obtiene en paralelo el contenido XML de varias URLs del BOE.
+
+        Las URLs incluidas en `condicionales` se piden con los validadores
+        HTTP guardados y pueden devolver NO_MODIFICADO.
+        """
+        return self._obtener_contenidos_xml(urls, condicionales)[0]
+
+    def clasificar_contenidos_xml(self, entradas, buscador):
+        """Descarga el XML de las entradas y evalúa las inclusiones.
+
+        Devuelve ({link: contenido}, {link: (regla, coincidencias) o None}). Solo
+        se piden de forma condicional (y pueden devolver NO_MODIFICADO) los
+        documentos ya descartados con las mismas reglas (buscador.huella); los
+        que se descartan ahora quedan anotados en la caché de validadores. En
+        modo procesos la evaluación se hace junto al parseo y de los documentos
+        descartados solo vuelven los metadatos, sin el texto.
+        """
+        links = [entrada['link'] for entrada in entradas]
+        condicionales = {link for link in links
+                         if self.cache_http.descartado(self.convertir_url_a_xml(link), buscador.huella)}
+        contenidos, evaluaciones = self._obtener_contenidos_xml(
+            links, condicionales, {entrada['link']: entrada for entrada in entradas}, buscador)
+        with METRICAS.cronometro('filtrado', fase='texto_completo'):
+            for entrada in entradas:
+                contenido_xml = contenidos.get(entrada['link'])
+                if not contenido_xml or contenido_xml is NO_MODIFICADO or contenido_xml is PENDIENTE:
+                    continue
+                # Documentos ya parseados (descargas reutilizadas o modo hilos): se evalúan aquí
+                if entrada['link'] not in evaluaciones:
+                    evaluaciones[entrada['link']] = buscador.evaluar({**entrada, 'contenido_xml': contenido_xml})
+                if evaluaciones[entrada['link']] is None:
+                    self.cache_http.marcar_descartado(self.convertir_url_a_xml(entrada['link']),
+                                                      buscador.huella)
+        return contenidos, evaluaciones
+
+    def _obtener_contenidos_xml(self, urls, condicionales=(), entradas=None, buscador=None):
+        """Descarga en paralelo y, en modo procesos, parsea por lotes. Devuelve (contenidos, evaluaciones)"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        resultados = {}
+        evaluaciones = {}
+        if not urls:
+            return resultados, evaluaciones
+        
+        self.logger.info(f"⬇️ Descargando {len(urls)} documentos XML "
+                         f"(máx. {self.max_descargas} simultáneos)")
+        with ThreadPoolExecutor(max_workers=self.max_descargas) as executor:
+            futuros = {}
+            for url in urls:
+                # Un mismo documento publicado en varios feeds se descarga una sola vez
+                futuro, _ = self.descargas.obtener_o_lanzar(
+                    extraer_boe_id(url) or url,
+                    lambda url=url: executor.submit(
+                        self.limitador.ejecutar, url, self.obtener_contenido_xml,
+                        url, url in condicionales))
+                futuros[futuro] = futuros.get(futuro, []) + [url]
+            for futuro in as_completed(futuros):
+                for url in futuros[futuro]:
+                    resultados[url] = futuro.result()
+        crudos = {url: contenido for url, contenido in resultados.items()
+                  if isinstance(contenido, DocumentoCrudo)}
+        if crudos:
+            evaluaciones = self._procesar_crudos(resultados, crudos, entradas or {}, buscador)
+        
+        sin_cambios = sum(1 for contenido in resultados.values() if contenido is NO_MODIFICADO)
+        aplazados = sum(1 for contenido in resultados.values() if contenido is PENDIENTE)
+        descargados = sum(1 for contenido in resultados.values() if contenido) - sin_cambios - aplazados
+        self.logger.info(f"📦 {descargados}/{len(urls)} documentos XML obtenidos, "
+                         f"{sin_cambios} sin cambios (304), {aplazados} aplazados")
+        return resultados, evaluaciones
+
+    def _procesar_crudos(self, resultados, crudos, entradas, buscador=None):
+        """Parsea (y evalúa si hay buscador) en los procesos auxiliares los XML descargados.
+
+        Sustituye en `resultados` cada documento crudo por el parseado y devuelve
+        {url: coincidencia} de los documentos evaluados.
+        """
+        with METRICAS.cronometro('procesos_lote'):
+            procesados = self.procesador.procesar(
+                [(url, entradas.get(url, {}), crudo.contenido) for url, crudo in crudos.items()],
+                buscador.inclusiones if buscador else None)
+        evaluaciones = {}
+        for url, (contenido, coincidencia) in procesados.items():
+            clave = extraer_boe_id(url) or url
+            if contenido is None:
+                METRICAS.contar('xml_parseo_errores_total')
+                self.logger.error(f"❌ Error al parsear XML de {url}")
+                resultados[url] = None
+                self.descargas.descartar(clave)
+                continue
+            self.cache_http.registrar(self.convertir_url_a_xml(url), crudos[url])
+            resultados[url] = contenido
+            if buscador:
+                evaluaciones[url] = coincidencia
+            if 'texto' in contenido:
+                # Quien reutilice la descarga recibe el documento ya parseado
+                self.descargas.sustituir(clave, contenido)
+            else:
+                self.descargas.descartar(clave)
+        return evaluaciones
+
+    @METRICAS.medir('xml_parseo')
     def parsear_xml(self, xml_content):
-        """Parsea el contenido XML y extrae la información relevante"""
+        """Parsea el contenido XML (texto, bytes o fragmentos) y extrae la información relevante"""
         try:
-            root = ET.fromstring(xml_content)
-            # Extraer información relevante del XML
-            metadata = {
-                'texto': self._extraer_texto_xml(root),
-                'departamento': self._extraer_elemento_xml(root, './/departamento'),
-                'rango': self._extraer_elemento_xml(root, './/rango'),
-                'titulo': self._extraer_elemento_xml(root, './/titulo'),
-                'fecha_publicacion': self._extraer_elemento_xml(root, './/fecha_publicacion')
-            }
-            return metadata
+            return parsear_documento(xml_content)
+        except requests.RequestException:
+            # Corte de la conexión mientras llega el cuerpo: lo trata quien descarga
+            raise
         except Exception as e:
+            METRICAS.contar('xml_parseo_errores_total')
             self.logger.error(f"❌ Error al parsear XML: {str(e)}")
             return None
-
-    def _extraer_texto_xml(self, root):
-        """Extrae y concatena el texto relevante del XML"""
-        texto_elementos = root.findall('.//texto')
-        return '\n'.join(elem.text for elem in texto_elementos if elem.text)
-
-    def _extraer_elemento_xml(self, root, xpath):
-        """Extrae el texto de un elemento XML específico"""
-        elemento = root.find(xpath)
-        return elemento.text if elemento is not None else ''
   
\ No newline at end of file
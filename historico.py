@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from email.utils import format_datetime
+from utils.almacen import extraer_boe_id
+
+try:
+    from zoneinfo import ZoneInfo
+    ZONA_BOE = ZoneInfo('Europe/Madrid')
+except Exception:
+    from datetime import timezone
+    ZONA_BOE = timezone.utc
+
+URL_SUMARIO = "https://www.boe.es/datosabiertos/api/boe/sumario/{fecha}"
+
+
+def parsear_fecha(texto):
+    """Convierte AAAA-MM-DD en date (para argparse)"""
+    return date.fromisoformat(texto)
+
+
+def rango_fechas(desde, hasta):
+    """Genera las fechas entre desde y hasta, ambas incluidas"""
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def parsear_sumario(xml_content, fecha):
+    """Convierte el sumario diario del BOE en entradas con el formato del RSS.
+
+    Devuelve diccionarios con las mismas claves que feedparser (id, title,
+    summary, link, published) para poder pasarlos a procesar_entrada_boe.
+    """
+    root = ET.fromstring(xml_content)
+    publicado = format_datetime(datetime(fecha.year, fecha.month, fecha.day, tzinfo=ZONA_BOE))
+    entradas = []
+    for seccion in root.iter('seccion'):
+        for departamento in seccion.iter('departamento'):
+            for epigrafe, item in _items_con_epigrafe(departamento):
+                identificador = item.findtext('identificador', '')
+                partes = [seccion.get('nombre', ''), departamento.get('nombre', ''), epigrafe,
+                          f"Referencia: {identificador}"]
+                entradas.append({
+                    'id': item.findtext('url_pdf', '') or identificador,
+                    'title': item.findtext('titulo', ''),
+                    'summary': ' - '.join(parte for parte in partes if parte),
+                    'link': item.findtext('url_html', '') or item.findtext('url_xml', ''),
+                    'published': publicado
+                })
+    return entradas
+
+
+def _items_con_epigrafe(departamento):
+    """Recorre los items de un departamento, estén o no agrupados en epígrafes"""
+    for hijo in departamento:
+        if hijo.tag == 'epigrafe':
+            for item in hijo.iter('item'):
+                yield hijo.get('nombre', ''), item
+        elif hijo.tag == 'item':
+            yield '', hijo
+
+
+class RecuperadorHistorico:
+    """Recorre los sumarios diarios del BOE de un rango de fechas en paralelo.
+
+    Para cada día ejecuta procesar_entradas_boe → filtro → actualizar_datos_boe
+    (que descarga el XML de las entradas incluidas, sin enviar avisos). Los
+    días completados se registran en un archivo de control, de modo que una
+    recuperación interrumpida se reanuda sin volver a descargarlos.
+    """
+
+    def __init__(self, monitor, filtro, checkpoint_file, url_sumario=URL_SUMARIO, dias_paralelos=4):
+        self.monitor = monitor
+        self.logger = monitor.logger
+        self.filtro = filtro
+        self.checkpoint_file = checkpoint_file
+        self.url_sumario = url_sumario
+        self.dias_paralelos = dias_paralelos
+        self._lock = threading.Lock()
+        self._completados = self._cargar_checkpoint()
+
+    def _cargar_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return set(json.load(f).get('dias_completados', []))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return set()
+
+    def _marcar_completado(self, dia):
+        with self._lock:
+            self._completados.add(dia.isoformat())
+            temporal = f"{self.checkpoint_file}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'dias_completados': sorted(self._completados)}, f)
+            os.replace(temporal, self.checkpoint_file)
+
+    def obtener_sumario(self, dia):
+        """Descarga el sumario de un día. Devuelve [] si ese día no hubo BOE y None si falla"""
+        url = self.url_sumario.format(fecha=dia.strftime('%Y%m%d'))
+        cabeceras = {**self.monitor.headers, 'Accept': 'application/xml'}
+        response = self.monitor.limitador.ejecutar(
+            url, self.monitor.cliente.get, url, headers=cabeceras, timeout=30)
+        if response.status_code == 404:
+            return []
+        if response.status_code != 200:
+            self.logger.error(f"❌ Error al obtener el sumario del {dia}. Status: {response.status_code}")
+            return None
+        return parsear_sumario(response.content, dia)
+
+    def procesar_dia(self, dia):
+        items = self.obtener_sumario(dia)
+        if items is None:
+            return False
+        entradas = self.monitor.procesar_entradas_boe(items)
+        for entrada in entradas:
+            entrada['link'] = self.monitor.convertir_url_a_xml(entrada['link'])
+        try:
+            incluidas = self.filtro(entradas)
+            if incluidas and not self.monitor.actualizar_datos_boe(incluidas, notificar=False):
+                return False
+        finally:
+            # Los documentos del día no se vuelven a pedir: se liberan del registro de descargas
+            for entrada in entradas:
+                self.monitor.descargas.descartar(extraer_boe_id(entrada['link']) or entrada['link'])
+        self.logger.info(f"📅 {dia}: {len(entradas)} disposiciones, {len(incluidas)} incluidas")
+        return True
+
+    def ejecutar(self, desde, hasta):
+        """Recupera el rango de fechas. Devuelve (días procesados, días con error)"""
+        dias = [dia for dia in rango_fechas(desde, hasta) if dia.isoformat() not in self._completados]
+        self.logger.start_operation(f"Recuperación histórica {desde} → {hasta} ({len(dias)} días pendientes)")
+        procesados = fallidos = 0
+        with ThreadPoolExecutor(max_workers=self.dias_paralelos, thread_name_prefix='historico') as executor:
+            futuros = {executor.submit(self.procesar_dia, dia): dia for dia in dias}
+            for futuro in as_completed(futuros):
+                dia = futuros[futuro]
+                try:
+                    correcto = futuro.result()
+                except Exception as e:
+                    self.logger.error(f"❌ Error procesando el {dia}: {str(e)}")
+                    correcto = False
+                if correcto:
+                    self._marcar_completado(dia)
+                    procesados += 1
+                else:
+                    fallidos += 1
+        self.monitor.cache_http.guardar()
+        self.logger.end_operation(f"Recuperación histórica: {procesados} días procesados, {fallidos} con error")
+        return procesados, fallidos
@@ -1,33 +1,23 @@
 import os
+import sqlite3
 from boe_monitor import BOEKitMonitor
-from pathlib import Path
+from planificador import PlanificadorFeeds
+from historico import RecuperadorHistorico, URL_SUMARIO, parsear_fecha
+from utils.config_loader import ConfigLoader
+from utils.coincidencias import (BuscadorInclusiones, RecargadorInclusiones,
+                                 INCLUIDA, TEXTO_COMPLETO)
+from utils.cache_http import NO_MODIFICADO
+from utils.cliente_http import PENDIENTE
+from utils.indice_textual import consulta_frase, consulta_segura
+from utils.blobs import externalizar_almacen
+from utils.clasificador import ClasificadorEntradas
+from utils.metricas import METRICAS
+from utils.logger import configurar_logs, obtener_logger
 import json
-from datetime import datetime
-import logging
 
 def setup_logger():
-    """Configura un logger básico para errores generales"""
-    logger = logging.getLogger('main')
-    logger.setLevel(logging.INFO)
-    
-    # Crear handler para archivo
-    fh = logging.FileHandler('logs/boe_monitor.log')
-    fh.setLevel(logging.INFO)
-    
-    # Crear handler para consola
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    
-    # Formato del log
-    formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(message)s\n           {Process ID: %(process)d - Thread: %(threadName)s}')
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
-    
-    # Añadir handlers al logger
-    logger.addHandler(fh)
-    logger.addHandler(ch)
-    
-    return logger
+    """Logger para errores generales; comparte los handlers (y la cola) del monitor"""
+    return obtener_logger('main')
 
 def cargar_inclusiones(inclusiones_file="config/inclusiones.json"):
     """Carga las inclusiones desde el archivo de configuración"""
@@ -41,100 +31,199 @@ def cargar_inclusiones(inclusiones_file="config/inclusiones.json"):
             "rangos_incluidos": []
         }
 
+@METRICAS.medir('filtrado')
 def filtrar_entradas(entradas, inclusiones, logger=None):
     """
     Filtra las entradas asegurando que solo se incluyan las que realmente coinciden
-    con los criterios especificados en inclusiones.json
+    con los criterios especificados en inclusiones.json.
+
+    `inclusiones` puede ser el diccionario cargado o un BuscadorInclusiones ya
+    compilado para reutilizarlo entre ejecuciones.
     """
+    buscador = (inclusiones if isinstance(inclusiones, BuscadorInclusiones)
+                else BuscadorInclusiones(inclusiones))
     filtradas = []
     total_entradas = len(entradas)
     
     for entrada in entradas:
+        resultado = buscador.evaluar(entrada)
+        if resultado is None:
+            continue
+        
+        regla, coincidencias = resultado
+        entrada['coincidencias'] = coincidencias
+        filtradas.append(entrada)
         if logger:
-            logger.debug(f"Analizando entrada: {entrada.get('titulo', '')[:100]}...")
+            logger.debug("Coincide por %s (%s): %.100s", regla, coincidencias, entrada.get('titulo', ''))
 
-        # Ignorar entradas que contengan términos específicos no deseados
-        if any(termino.lower() in entrada.get('titulo', '').lower() 
-               for termino in ['universidad', 'corrección de errores', 'fe de erratas']):
-            continue
-            
-        texto_busqueda = ' '.join(filter(None, [
-            entrada.get('titulo', ''),
-            entrada.get('descripcion', ''),
-            entrada.get('departamento', ''),
-            entrada.get('contenido_xml', {}).get('texto', ''),
-            entrada.get('contenido_xml', {}).get('departamento', '')
-        ])).lower()
-
-        # Criterios de inclusión más flexibles
-        cumple_criterios = False
-
-        # 1. Verificar si coincide con departamentos incluidos
-        if any(dep.lower() in texto_busqueda for dep in inclusiones['departamentos_incluidos']):
-            cumple_criterios = True
-            if logger:
-                logger.debug(f"Coincide con departamento: {entrada.get('titulo', '')[:100]}")
-
-        # 2. Verificar si coincide con palabras clave
-        if any(palabra.lower() in texto_busqueda for palabra in inclusiones['palabras_clave_incluidas']):
-            cumple_criterios = True
-            if logger:
-                logger.debug(f"Coincide con palabra clave: {entrada.get('titulo', '')[:100]}")
-
-        # 3. Verificar rangos específicos
-        if any(rango.lower() in texto_busqueda for rango in inclusiones['rangos_incluidos']):
-            if any(dep.lower() in texto_busqueda for dep in inclusiones['departamentos_incluidos']):
-                cumple_criterios = True
+    contar_filtrado(total_entradas, len(filtradas), logger)
+    return filtradas
+
+def contar_filtrado(total_entradas, incluidas, logger=None):
+    METRICAS.contar('filtrado_entradas_total', incluidas, resultado='incluida')
+    METRICAS.contar('filtrado_entradas_total', total_entradas - incluidas, resultado='descartada')
+    if logger:
+        logger.info(f"De {total_entradas} entradas, {incluidas} cumplen con los criterios de inclusión")
+
+def prefiltrar_entradas(entradas, buscador, logger=None):
+    """
+    Primera etapa del filtro, solo con título, descripción y departamento del RSS.
+    Devuelve (incluidas, pendientes): las que ya cumplen los criterios y las que
+    necesitan el texto completo del documento para decidir.
+    """
+    incluidas = []
+    pendientes = []
+    for entrada in entradas:
+        decision, resultado = buscador.preclasificar(entrada)
+        if decision == INCLUIDA:
+            entrada['coincidencias'] = resultado[1]
+            incluidas.append(entrada)
+        elif decision == TEXTO_COMPLETO:
+            pendientes.append(entrada)
+    
+    METRICAS.contar('prefiltro_entradas_total', len(incluidas), resultado='incluida')
+    METRICAS.contar('prefiltro_entradas_total', len(pendientes), resultado='texto_completo')
+    METRICAS.contar('prefiltro_entradas_total', len(entradas) - len(incluidas) - len(pendientes),
+                    resultado='descartada')
+    if logger:
+        logger.info(f"Prefiltro RSS: {len(incluidas)} incluidas, {len(pendientes)} pendientes de texto "
+                    f"completo, {len(entradas) - len(incluidas) - len(pendientes)} descartadas")
+    return incluidas, pendientes
+
+def filtrar_en_dos_etapas(monitor, entradas, inclusiones, logger=None):
+    """
+    Filtra primero con los metadatos del RSS y solo descarga el XML de las
+    entradas que necesitan el texto completo para decidir.
+    """
+    buscador = (inclusiones if isinstance(inclusiones, BuscadorInclusiones)
+                else BuscadorInclusiones(inclusiones))
+    with METRICAS.cronometro('filtrado', fase='rss'):
+        incluidas, pendientes = prefiltrar_entradas(entradas, buscador, logger)
+    if not pendientes:
+        return incluidas
+    
+    # Las pendientes que ya están en el almacén pasaron el filtro en una ejecución anterior
+    conocidas = monitor.ids_conocidos(entrada['id'] for entrada in pendientes)
+    incluidas += [entrada for entrada in pendientes if entrada['id'] in conocidas]
+    incluidas_rss = len(incluidas)
+    por_revisar = [entrada for entrada in pendientes if entrada['id'] not in conocidas]
+    
+    # Solo los documentos descartados antes con las mismas reglas se piden de forma
+    # condicional: un 304 indica que siguen sin cumplirlas. La descarga queda en el
+    # registro compartido del monitor y actualizar_datos_boe la reutiliza sin
+    # volver a pedirla. En modo procesos el parseo y la evaluación se hacen en los
+    # procesos auxiliares.
+    contenidos, evaluaciones = monitor.clasificar_contenidos_xml(por_revisar, buscador)
+    con_texto = 0
+    aplazadas = []
+    for entrada in por_revisar:
+        contenido_xml = contenidos.get(entrada['link'])
+        if contenido_xml is PENDIENTE:
+            aplazadas.append(entrada)
+        elif contenido_xml and contenido_xml is not NO_MODIFICADO:
+            con_texto += 1
+            resultado = evaluaciones.get(entrada['link'])
+            if resultado:
+                entrada['contenido_xml'] = contenido_xml
+                entrada['coincidencias'] = resultado[1]
+                incluidas.append(entrada)
                 if logger:
-                    logger.debug(f"Coincide con rango y departamento: {entrada.get('titulo', '')[:100]}")
+                    logger.debug("Coincide por %s (%s): %.100s", resultado[0], resultado[1],
+                                 entrada.get('titulo', ''))
+    # Sin el texto no se puede decidir: se vuelven a filtrar cuando boe.es responda
+    if aplazadas:
+        monitor.pendientes.agregar(aplazadas)
+    
+    contar_filtrado(con_texto, len(incluidas) - incluidas_rss, logger)
+    return incluidas
 
-        if cumple_criterios:
-            filtradas.append(entrada)
+def exportar_metricas(config, logger=None):
+    """Escribe las métricas acumuladas en formato Prometheus y el resumen JSON de la
+    ejecución (o del ciclo, en modo demonio), y empieza el ciclo siguiente"""
+    opciones = config.get('metricas', {})
+    try:
+        if opciones.get('textfile'):
+            METRICAS.escribir_textfile(opciones['textfile'])
+        if opciones.get('resumen'):
+            METRICAS.guardar_resumen(opciones['resumen'])
+    except OSError as e:
+        if logger:
+            logger.error(f"Error al exportar las métricas: {str(e)}")
+    finally:
+        METRICAS.nuevo_ciclo()
 
+def servir_metricas(config, logger=None):
+    """Publica /metrics por HTTP si metricas.puerto_http está configurado"""
+    puerto = config.get('metricas', {}).get('puerto_http')
+    if not puerto:
+        return None
+    servidor = METRICAS.servir_http(puerto)
     if logger:
-        logger.info(f"De {total_entradas} entradas, {len(filtradas)} cumplen con los criterios de inclusión")
-        for entrada in filtradas:
-            logger.info(f"Entrada incluida: {entrada.get('titulo', '')[:100]}")
+        logger.info(f"📈 Métricas disponibles en http://localhost:{puerto}/metrics")
+    return servidor
+
+def crear_monitor(config, rss_url, data_file="data/datos_boe.json", email_config=None):
+    """Crea un BOEKitMonitor con los parámetros de config/config.json y el SMTP de secrets.env"""
+    configurar_logs(config.get('logs'))
+    return BOEKitMonitor(
+        rss_url, data_file, email_config or ConfigLoader.load_secrets(),
+        max_descargas=config.get('max_descargas_concurrentes', 8),
+        max_por_host=config.get('max_descargas_por_host', 4),
+        intervalo_por_host=config.get('intervalo_por_host', 0.0),
+        tipo_almacen=config.get('almacen', 'sqlite'),
+        modo_notificacion=config.get('modo_notificacion', 'resumen'),
+        revalidar_cada=(config['revalidar_cada_horas'] * 3600
+                        if config.get('revalidar_cada_horas') is not None else None),
+        opciones_http=config.get('http'),
+        procesos=config.get('procesos', 0),
+        clasificador=ClasificadorEntradas.desde_configuracion(cargar_inclusiones(), config.get('keywords', []))
+    )
+
+def procesar_feed(monitor, inclusiones):
+    """Lee el RSS del monitor, filtra por inclusiones y guarda las entradas con su XML"""
+    nuevas_entradas = monitor.obtener_nuevas_entradas()
     
-    return filtradas
+    if nuevas_entradas or len(monitor.pendientes):
+        for entrada in nuevas_entradas:
+            if 'link' in entrada:
+                entrada['link'] = entrada['link'].replace('/txt.php', '/xml.php')
+        
+        # Las entradas aplazadas en ejecuciones anteriores vuelven a pasar por el
+        # filtro; si el RSS trae la misma entrada prevalece la versión del RSS
+        ids_rss = {entrada['id'] for entrada in nuevas_entradas}
+        nuevas_entradas += [entrada for entrada in monitor.recuperar_pendientes()
+                            if entrada['id'] not in ids_rss]
+        
+        # Filtro en dos etapas: metadatos del RSS y, si hace falta, texto completo
+        entradas_filtradas = filtrar_en_dos_etapas(monitor, nuevas_entradas, inclusiones, monitor.logger)
+        
+        if entradas_filtradas:
+            # Descargar el XML de las entradas incluidas y guardarlas en el almacén
+            monitor.actualizar_datos_boe(entradas_filtradas)
+            
+            monitor.logger.info(f"Se procesaron {len(entradas_filtradas)} entradas en {monitor.almacen.db_file}")
+        else:
+            monitor.logger.info("No se encontraron entradas relevantes según los criterios de inclusión")
+    else:
+        monitor.logger.info("No se encontraron nuevas entradas")
+    # Un solo correo (o lote SMTP) por ejecución con todos los avisos del feed
+    monitor.enviar_notificaciones()
+    return len(nuevas_entradas)
 
 def main():
     # Crear logger general
     logger = setup_logger()
+    monitor = None
     
     try:
         # Configuración inicial
         rss_url = "https://www.boe.es/rss/boe.php?s=3"
-        data_file = "data/datos_boe.json"
-        email_config = "config/email_config.json"
-        inclusiones = cargar_inclusiones()
-        
-        monitor = BOEKitMonitor(rss_url, data_file, email_config)
-        nuevas_entradas = monitor.obtener_nuevas_entradas()
+        inclusiones = BuscadorInclusiones(cargar_inclusiones())
+        config = ConfigLoader.load_config()
         
-        if nuevas_entradas:
-            for entrada in nuevas_entradas:
-                if 'link' in entrada:
-                    entrada['link'] = entrada['link'].replace('/txt.php', '/xml.php')
-            
-            # Pasar el logger al llamar a filtrar_entradas
-            entradas_filtradas = filtrar_entradas(nuevas_entradas, inclusiones, monitor.logger)
-            
-            if entradas_filtradas:
-                # Actualizar el archivo JSON
-                datos_boe = {
-                    "ultimas_entradas": entradas_filtradas,
-                    "fecha_ultima_actualizacion": datetime.now().isoformat()
-                }
-                
-                with open(data_file, 'w', encoding='utf-8') as f:
-                    json.dump(datos_boe, f, ensure_ascii=False, indent=4)
-                
-                monitor.logger.info(f"Se guardaron correctamente {len(entradas_filtradas)} entradas en {data_file}")
-            else:
-                monitor.logger.info("No se encontraron entradas relevantes según los criterios de inclusión")
-        else:
-            monitor.logger.info("No se encontraron nuevas entradas")
+        monitor = crear_monitor(config, rss_url)
+        procesar_feed(monitor, inclusiones)
+        exportar_metricas(config, logger)
 
     except Exception as e:
         # Usar el logger general para errores
@@ -142,6 +231,187 @@ def main():
         # Log del traceback completo para debugging
         import traceback
         logger.error(f"Traceback completo:\n{traceback.format_exc()}")
+    finally:
+        if monitor:
+            monitor.cerrar()
+
+def monitorear_feeds(una_vez=False):
+    """Monitoriza en paralelo todos los feeds definidos en config/config.json"""
+    logger = setup_logger()
+    monitor = None
+    
+    try:
+        config = ConfigLoader.load_config()
+        inclusiones = BuscadorInclusiones(cargar_inclusiones())
+        feeds = config.get('feeds') or [{"nombre": "principal", "url": config['rss_url']}]
+        
+        monitor = crear_monitor(config, feeds[0]['url'])
+        planificador = PlanificadorFeeds(
+            monitor, feeds,
+            pipeline=lambda monitor_feed: procesar_feed(monitor_feed, inclusiones),
+            intervalo_por_defecto=config.get('intervalo_por_defecto', 900),
+            al_terminar_ciclo=lambda: exportar_metricas(config, logger)
+        )
+        planificador.ejecutar(una_vez=una_vez)
+    except KeyboardInterrupt:
+        logger.info("Monitorización de feeds detenida")
+    except Exception as e:
+        logger.error(f"Error inesperado en monitorear_feeds: {str(e)}")
+        import traceback
+        logger.error(f"Traceback completo:\n{traceback.format_exc()}")
+    finally:
+        if monitor:
+            monitor.cerrar()
+
+def ejecutar_demonio(inclusiones_file="config/inclusiones.json"):
+    """Modo demonio: mantiene residentes el monitor, su sesión, el buscador de
+    inclusiones y el índice de ids conocidos, y sondea los feeds según config.json"""
+    import signal
+    
+    logger = setup_logger()
+    monitor = None
+    
+    try:
+        config = ConfigLoader.load_config()
+        opciones = config.get('demonio', {})
+        feeds = config.get('feeds') or [{"nombre": "principal", "url": config['rss_url']}]
+        clasificador = {}
+        recargador = RecargadorInclusiones(
+            inclusiones_file, cargar_inclusiones,
+            al_recargar=lambda inclusiones: clasificador.update(
+                vigente=ClasificadorEntradas.desde_configuracion(inclusiones, config.get('keywords', []))))
+        
+        def procesar(monitor_feed):
+            # El buscador y el clasificador solo se reconstruyen si inclusiones.json ha cambiado
+            buscador = recargador.actual()
+            monitor_feed.clasificador = clasificador['vigente']
+            return procesar_feed(monitor_feed, buscador)
+        
+        monitor = crear_monitor(config, feeds[0]['url'])
+        monitor.activar_indice_memoria(opciones.get('max_indice_memoria', 50000))
+        planificador = PlanificadorFeeds(
+            monitor, feeds,
+            pipeline=procesar,
+            intervalo_por_defecto=opciones.get('intervalo', config.get('intervalo_por_defecto', 900)),
+            intervalo_publicacion=opciones.get('intervalo_horas_publicacion'),
+            horas_publicacion=opciones.get('horas_publicacion'),
+            al_terminar_ciclo=lambda: exportar_metricas(config, logger)
+        )
+        servir_metricas(config, monitor.logger)
+        signal.signal(signal.SIGTERM, lambda *_: planificador.parar())
+        monitor.logger.info(f"🛰️ Demonio iniciado con {len(feeds)} feeds")
+        planificador.ejecutar()
+        monitor.logger.info("🛑 Demonio detenido")
+    except KeyboardInterrupt:
+        logger.info("Demonio detenido")
+    except Exception as e:
+        logger.error(f"Error inesperado en el demonio: {str(e)}")
+        import traceback
+        logger.error(f"Traceback completo:\n{traceback.format_exc()}")
+    finally:
+        if monitor:
+            monitor.cerrar()
+
+def recuperar_historico(desde, hasta, url_sumario=None, dias_paralelos=None):
+    """Recupera las disposiciones publicadas entre dos fechas a partir de los sumarios diarios"""
+    logger = setup_logger()
+    monitor = None
+    
+    try:
+        config = ConfigLoader.load_config()
+        opciones = config.get('historico', {})
+        inclusiones = BuscadorInclusiones(cargar_inclusiones())
+        
+        monitor = crear_monitor(config, config.get('rss_url', ''))
+        recuperador = RecuperadorHistorico(
+            monitor,
+            filtro=lambda entradas: filtrar_en_dos_etapas(monitor, entradas, inclusiones, monitor.logger),
+            checkpoint_file=opciones.get('checkpoint', 'data/historico_checkpoint.json'),
+            url_sumario=url_sumario or opciones.get('url_sumario', URL_SUMARIO),
+            dias_paralelos=dias_paralelos or opciones.get('dias_paralelos', 4)
+        )
+        resultado = recuperador.ejecutar(desde, hasta)
+        exportar_metricas(config, logger)
+        return resultado
+    except Exception as e:
+        logger.error(f"Error inesperado en la recuperación histórica: {str(e)}")
+        import traceback
+        logger.error(f"Traceback completo:\n{traceback.format_exc()}")
+    finally:
+        if monitor:
+            monitor.cerrar()
+
+def buscar_documentos(consulta, frase=False, departamento=None, rango=None,
+                      desde=None, hasta=None, limite=20, reindexar=False):
+    """Consulta el índice textual de los documentos almacenados e imprime los resultados"""
+    config = ConfigLoader.load_config()
+    monitor = crear_monitor(config, config.get('rss_url', ''))
+    indice = monitor.indice_textual
+    
+    def buscar(expresion):
+        return indice.buscar(expresion, departamento=departamento, rango=rango,
+                             desde=desde, hasta=hasta, limite=limite)
+    
+    try:
+        if reindexar or (indice.contar() == 0 and monitor.almacen.contar() > 0):
+            print(f"Indexando {monitor.almacen.contar()} entradas...")
+            indice.reindexar(monitor.almacen)
+        try:
+            resultados = buscar(consulta_frase(consulta) if frase else consulta)
+        except sqlite3.OperationalError:
+            # Sintaxis FTS5 no válida (p. ej. "Real Decreto-ley"): se repite con los términos escapados
+            try:
+                resultados = buscar(consulta_segura(consulta))
+            except sqlite3.OperationalError as e:
+                print(f"Consulta no válida: {consulta} ({str(e)})")
+                return []
+    finally:
+        monitor.cerrar()
+    print(f"\n{len(resultados)} resultados para: {consulta}")
+    print("-" * 40)
+    for resultado in resultados:
+        print(f"- {resultado['fecha_publicacion'][:10]} [{resultado['rango'] or 'Sin rango'}] "
+              f"{resultado['titulo'][:100]}")
+        print(f"  {resultado['departamento']} · {resultado['id']}")
+        if resultado['fragmento']:
+            print(f"  {resultado['fragmento']}")
+    return resultados
+
+def externalizar_textos():
+    """Mueve al almacén de blobs los textos que versiones anteriores guardaban en línea"""
+    config = ConfigLoader.load_config()
+    monitor = crear_monitor(config, config.get('rss_url', ''))
+    try:
+        reescritas = externalizar_almacen(monitor.almacen)
+        if reescritas:
+            monitor.almacen.compactar()
+    finally:
+        monitor.cerrar()
+    print(f"{reescritas} entradas con el texto movido a {monitor.almacen.blobs.directorio}")
+    return reescritas
+
+def mostrar_versiones(id_documento, version=None, diferencia=False, desde=None):
+    """Lista las versiones de un documento o imprime una de ellas (o su diff)"""
+    config = ConfigLoader.load_config()
+    monitor = crear_monitor(config, config.get('rss_url', ''))
+    historial = monitor.historial
+    try:
+        versiones = historial.versiones(id_documento)
+        if not versiones:
+            print(f"No hay versiones de {id_documento}")
+            return None
+        if diferencia:
+            print(historial.diferencia(id_documento, version, desde) or "Sin cambios")
+        elif version is not None:
+            print(historial.texto(id_documento, version))
+        else:
+            print(f"\n{len(versiones)} versiones de {id_documento}")
+            print("-" * 40)
+            for registro in versiones:
+                print(f"- v{registro['version']} · {registro['fecha'][:19]}")
+        return versiones
+    finally:
+        monitor.cerrar()
 
 def inicializar_archivo_datos(data_file):
     """Inicializa el archivo de datos si no existe o está corrupto"""
@@ -169,4 +439,48 @@ def obtener_entrada():
     return entrada
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Monitor del BOE")
+    subcomandos = parser.add_subparsers(dest="comando")
+    parser_feeds = subcomandos.add_parser("feeds", help="Monitoriza todos los feeds de config.json")
+    parser_feeds.add_argument("--una-vez", action="store_true", help="Ejecuta un solo ciclo y termina")
+    subcomandos.add_parser("demonio", help="Ejecuta el monitor como proceso residente")
+    parser_historico = subcomandos.add_parser("historico", help="Recupera un rango de fechas desde los sumarios diarios")
+    parser_historico.add_argument("--desde", type=parsear_fecha, required=True, help="Fecha inicial (AAAA-MM-DD)")
+    parser_historico.add_argument("--hasta", type=parsear_fecha, required=True, help="Fecha final (AAAA-MM-DD)")
+    parser_historico.add_argument("--url-sumario", help="Plantilla de URL del sumario con {fecha} (AAAAMMDD)")
+    parser_historico.add_argument("--dias-paralelos", type=int, help="Días procesados simultáneamente")
+    parser_buscar = subcomandos.add_parser("buscar", help="Busca en el texto de los documentos almacenados")
+    parser_buscar.add_argument("consulta", help="Términos de búsqueda (sintaxis FTS5)")
+    parser_buscar.add_argument("--frase", action="store_true", help="Busca la consulta como frase exacta")
+    parser_buscar.add_argument("--departamento", help="Filtra por departamento (subcadena)")
+    parser_buscar.add_argument("--rango", help="Filtra por rango (p. ej. 'Real Decreto')")
+    parser_buscar.add_argument("--desde", type=parsear_fecha, help="Fecha de publicación mínima (AAAA-MM-DD)")
+    parser_buscar.add_argument("--hasta", type=parsear_fecha, help="Fecha de publicación máxima (AAAA-MM-DD)")
+    parser_buscar.add_argument("--limite", type=int, default=20, help="Número máximo de resultados")
+    parser_buscar.add_argument("--reindexar", action="store_true", help="Reconstruye el índice antes de buscar")
+    subcomandos.add_parser("externalizar-textos",
+                           help="Mueve los textos guardados en línea al almacén comprimido de blobs")
+    parser_versiones = subcomandos.add_parser("versiones", help="Historial de versiones de un documento")
+    parser_versiones.add_argument("id", help="Id de la entrada (p. ej. su URL en el RSS)")
+    parser_versiones.add_argument("--version", type=int, help="Versión a mostrar (por defecto la lista)")
+    parser_versiones.add_argument("--diff", action="store_true", help="Muestra los cambios en lugar del texto")
+    parser_versiones.add_argument("--desde", type=int, help="Versión con la que comparar (por defecto la anterior)")
+    args = parser.parse_args()
+    
+    if args.comando == "feeds":
+        monitorear_feeds(una_vez=args.una_vez)
+    elif args.comando == "demonio":
+        ejecutar_demonio()
+    elif args.comando == "historico":
+        recuperar_historico(args.desde, args.hasta, args.url_sumario, args.dias_paralelos)
+    elif args.comando == "buscar":
+        buscar_documentos(args.consulta, args.frase, args.departamento, args.rango,
+                          args.desde, args.hasta, args.limite, args.reindexar)
+    elif args.comando == "externalizar-textos":
+        externalizar_textos()
+    elif args.comando == "versiones":
+        mostrar_versiones(args.id, args.version, args.diff, args.desde)
+    else:
+        main() 
\ No newline at end of file
@@ -0,0 +1,99 @@
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+def procesar_feed(monitor):
+    """Pipeline por defecto de un feed: leer el RSS y actualizar el almacén"""
+    nuevas_entradas = monitor.obtener_nuevas_entradas()
+    ids_rss = {entrada['id'] for entrada in nuevas_entradas}
+    nuevas_entradas += [entrada for entrada in monitor.recuperar_pendientes()
+                        if entrada['id'] not in ids_rss]
+    if nuevas_entradas:
+        monitor.actualizar_datos_boe(nuevas_entradas)
+    monitor.enviar_notificaciones()
+    return len(nuevas_entradas)
+
+
+class PlanificadorFeeds:
+    """Monitoriza varios feeds del BOE en paralelo, cada uno con su intervalo.
+
+    Todos los feeds comparten la sesión HTTP, la caché de validadores, el
+    almacén y el registro de descargas del monitor base, de modo que un
+    documento publicado en varios feeds se descarga una sola vez por ciclo.
+    """
+
+    def __init__(self, monitor_base, feeds, pipeline=procesar_feed, intervalo_por_defecto=900,
+                 intervalo_publicacion=None, horas_publicacion=None, al_terminar_ciclo=None):
+        self.logger = monitor_base.logger
+        self.monitor_base = monitor_base
+        self.pipeline = pipeline
+        # Se llama tras cada ciclo con feeds ejecutados (p. ej. para exportar métricas)
+        self.al_terminar_ciclo = al_terminar_ciclo
+        # Durante las horas de publicación [inicio, fin) se sondea con más frecuencia
+        self.intervalo_publicacion = intervalo_publicacion
+        self.horas_publicacion = horas_publicacion
+        self.feeds = []
+        for feed in feeds:
+            self.feeds.append({
+                'nombre': feed.get('nombre', feed['url']),
+                'intervalo': feed.get('intervalo', intervalo_por_defecto),
+                'monitor': monitor_base.clonar_para_feed(feed['url']),
+                'proxima': 0.0
+            })
+        self._parar = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.feeds)),
+                                            thread_name_prefix='feed')
+
+    def _intervalo(self, feed):
+        if self.intervalo_publicacion and self.horas_publicacion:
+            inicio, fin = self.horas_publicacion
+            if inicio <= datetime.now().hour < fin:
+                return min(feed['intervalo'], self.intervalo_publicacion)
+        return feed['intervalo']
+
+    def _ejecutar_feed(self, feed):
+        try:
+            self.logger.start_operation(f"Feed {feed['nombre']}")
+            total = self.pipeline(feed['monitor'])
+            self.logger.end_operation(f"Feed {feed['nombre']} ({total} entradas)")
+        except Exception as e:
+            self.logger.error(f"❌ Error procesando el feed {feed['nombre']}: {str(e)}")
+
+    def ejecutar_ciclo(self):
+        """Lanza en paralelo los feeds cuyo intervalo ha vencido y espera a que terminen"""
+        ahora = time.monotonic()
+        pendientes = [feed for feed in self.feeds if feed['proxima'] <= ahora]
+        for feed in pendientes:
+            feed['proxima'] = ahora + self._intervalo(feed)
+        for futuro in [self._executor.submit(self._ejecutar_feed, feed) for feed in pendientes]:
+            futuro.result()
+        # Las descargas solo se comparten dentro del ciclo: en el siguiente un documento
+        # con metadatos cambiados se vuelve a pedir y no se retienen los textos
+        self.monitor_base.terminar_ciclo()
+        if pendientes and self.al_terminar_ciclo:
+            self.al_terminar_ciclo()
+        return len(pendientes)
+
+    def segundos_hasta_proximo(self):
+        if not self.feeds:
+            return None
+        return max(0.0, min(feed['proxima'] for feed in self.feeds) - time.monotonic())
+
+    def ejecutar(self, una_vez=False):
+        """Bucle principal: ejecuta los feeds según su intervalo hasta que se llame a parar()"""
+        try:
+            while not self._parar.is_set():
+                self.ejecutar_ciclo()
+                if una_vez:
+                    break
+                espera = self.segundos_hasta_proximo()
+                if espera is None:
+                    break
+                self._parar.wait(espera)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,132 @@
+"""Recuperación histórica contra un servidor local de sumarios y documentos"""
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from boe_monitor import BOEKitMonitor
+from historico import RecuperadorHistorico
+
+# Disposiciones publicadas cada día; el 2099-01-04 no hubo BOE (404)
+PUBLICADAS = {
+    '20990102': ['BOE-A-2099-1', 'BOE-A-2099-2'],
+    '20990103': ['BOE-A-2099-3', 'BOE-A-2099-4'],
+}
+
+
+def sumario(base_url, boe_ids):
+    items = ''.join(
+        f"<item><identificador>{boe_id}</identificador>"
+        f"<titulo>Resolución de convocatoria {boe_id}</titulo>"
+        f"<url_pdf>https://www.boe.es/boe/dias/2099/01/02/pdfs/{boe_id}.pdf</url_pdf>"
+        f"<url_html>{base_url}/diario_boe/txt.php?id={boe_id}</url_html></item>"
+        for boe_id in boe_ids)
+    return ('<?xml version="1.0" encoding="utf-8"?><response><data><sumario><diario>'
+            '<seccion codigo="3" nombre="III. Otras disposiciones">'
+            '<departamento codigo="1" nombre="MINISTERIO DE HACIENDA">'
+            f'<epigrafe nombre="Subvenciones">{items}</epigrafe>'
+            '</departamento></seccion></diario></sumario></data></response>').encode('utf-8')
+
+
+def documento(boe_id):
+    return ('<?xml version="1.0" encoding="UTF-8"?><documento>'
+            f'<metadatos><identificador>{boe_id}</identificador>'
+            f'<titulo>Resolución de convocatoria {boe_id}</titulo>'
+            '<departamento codigo="1">MINISTERIO DE HACIENDA</departamento>'
+            '<rango codigo="1">Resolución</rango>'
+            '<fecha_publicacion>20990102</fecha_publicacion></metadatos>'
+            '<texto><p class="parrafo">Ayudas para la digitalización de pymes.</p></texto>'
+            '</documento>').encode('utf-8')
+
+
+@pytest.fixture
+def servidor():
+    """Servidor de fixtures; `caidos` son los días cuyo sumario responde 500"""
+    estado = {'peticiones': [], 'caidos': set()}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            estado['peticiones'].append(self.path)
+            if url.path.startswith('/sumario/'):
+                fecha = url.path.rsplit('/', 1)[-1]
+                if fecha in estado['caidos']:
+                    self._responder(500, b'')
+                elif fecha in PUBLICADAS:
+                    self._responder(200, sumario(estado['base_url'], PUBLICADAS[fecha]))
+                else:
+                    self._responder(404, b'')
+            elif url.path == '/diario_boe/xml.php':
+                self._responder(200, documento(parse_qs(url.query)['id'][0]))
+            else:
+                self._responder(404, b'')
+
+        def _responder(self, estado_http, cuerpo):
+            self.send_response(estado_http)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    http = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    estado['base_url'] = f"http://127.0.0.1:{http.server_address[1]}"
+    hilo = threading.Thread(target=http.serve_forever, daemon=True)
+    hilo.start()
+    yield estado
+    http.shutdown()
+    http.server_close()
+
+
+def recuperar(tmp_path, servidor, desde, hasta):
+    """Ejecuta una recuperación con un monitor nuevo, como haría cada invocación de main.py"""
+    monitor = BOEKitMonitor(
+        '', str(tmp_path / 'datos_boe.json'), {}, revalidar_cada=None,
+        opciones_http={'reintentos': 0})
+    try:
+        recuperador = RecuperadorHistorico(
+            monitor, filtro=lambda entradas: entradas,
+            checkpoint_file=str(tmp_path / 'historico_checkpoint.json'),
+            url_sumario=servidor['base_url'] + '/sumario/{fecha}', dias_paralelos=2)
+        return recuperador.ejecutar(desde, hasta), monitor.almacen.contar()
+    finally:
+        monitor.cerrar()
+
+
+def dias_completados(tmp_path):
+    with open(tmp_path / 'historico_checkpoint.json', encoding='utf-8') as f:
+        return json.load(f)['dias_completados']
+
+
+def test_recuperacion_interrumpida_se_reanuda(tmp_path, servidor):
+    desde, hasta = date(2099, 1, 2), date(2099, 1, 4)
+
+    # Primera ejecución: el sumario del día 3 falla y ese día queda pendiente
+    servidor['caidos'].add('20990103')
+    resultado, almacenadas = recuperar(tmp_path, servidor, desde, hasta)
+    assert resultado == (2, 1)
+    assert almacenadas == 2
+    assert dias_completados(tmp_path) == ['2099-01-02', '2099-01-04']
+
+    # Reanudación: solo se piden el sumario y los documentos del día pendiente
+    servidor['caidos'].clear()
+    servidor['peticiones'].clear()
+    resultado, almacenadas = recuperar(tmp_path, servidor, desde, hasta)
+    assert resultado == (1, 0)
+    assert almacenadas == 4
+    assert sorted(servidor['peticiones']) == [
+        '/diario_boe/xml.php?id=BOE-A-2099-3',
+        '/diario_boe/xml.php?id=BOE-A-2099-4',
+        '/sumario/20990103',
+    ]
+    assert dias_completados(tmp_path) == ['2099-01-02', '2099-01-03', '2099-01-04']
+
+    # Con el rango completo no queda nada que pedir
+    servidor['peticiones'].clear()
+    assert recuperar(tmp_path, servidor, desde, hasta) == ((0, 0), 4)
+    assert servidor['peticiones'] == []
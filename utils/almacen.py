@@ -0,0 +1,285 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from utils.huellas import calcular_huella, huella_rss, VERSION_HUELLAS
+from utils.blobs import externalizar_texto, texto_perezoso
+
+PATRON_BOE_ID = re.compile(r'BOE-[A-Z]-\d{4}-\d+')
+_PARTES_BOE_ID = re.compile(r'BOE-([A-Z])-(\d{4})-(\d{1,7})$')
+
+
+def extraer_boe_id(*textos):
+    """Extrae el identificador BOE-X-AAAA-NNNNN del primer texto que lo contenga"""
+    for texto in textos:
+        coincidencia = PATRON_BOE_ID.search(texto or '')
+        if coincidencia:
+            return coincidencia.group(0)
+    return None
+
+
+def codificar_boe_id(boe_id):
+    """BOE-X-AAAA-NNNNN → entero que conserva el orden (letra, año, número). None si no es válido"""
+    coincidencia = _PARTES_BOE_ID.match(boe_id or '')
+    if not coincidencia:
+        return None
+    letra, anio, numero = coincidencia.groups()
+    return ((ord(letra) - ord('A')) * 10_000 + int(anio)) * 10_000_000 + int(numero)
+
+
+def normalizar_fecha(fecha):
+    """Convierte la fecha RFC 822 del RSS a ISO 8601 para poder ordenar"""
+    try:
+        return parsedate_to_datetime(fecha).isoformat()
+    except (TypeError, ValueError, IndexError):
+        return fecha or ''
+
+
+class AlmacenBOE:
+    """Repositorio SQLite (modo WAL) de las entradas del BOE.
+
+    Con un AlmacenBlobs el texto de los documentos se guarda aparte y las
+    filas solo llevan su referencia; se carga al acceder a contenido_xml['texto'].
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS entradas (
+            id TEXT PRIMARY KEY,
+            boe_id TEXT,
+            fecha_publicacion TEXT,
+            departamento TEXT,
+            datos TEXT NOT NULL,
+            huella TEXT,
+            actualizado TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entradas_boe_id ON entradas (boe_id);
+        CREATE INDEX IF NOT EXISTS idx_entradas_fecha ON entradas (fecha_publicacion);
+        CREATE INDEX IF NOT EXISTS idx_entradas_departamento ON entradas (departamento);
+        CREATE TABLE IF NOT EXISTS metadatos (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """
+
+    def __init__(self, db_file, blobs=None):
+        self.db_file = db_file
+        self.blobs = blobs
+        directorio = os.path.dirname(db_file)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conexion = sqlite3.connect(db_file, check_same_thread=False)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.execute('PRAGMA synchronous=NORMAL')
+        self.conexion.executescript(self.ESQUEMA)
+        self._migrar()
+
+    def _migrar(self):
+        """Añade las columnas que faltan en bases creadas con versiones anteriores y
+        recalcula la parte 'rss' de las huellas si cambió su cálculo (VERSION_HUELLAS)"""
+        columnas = {fila[1] for fila in self.conexion.execute("PRAGMA table_info(entradas)")}
+        if 'huella' not in columnas:
+            with self.conexion:
+                self.conexion.execute("ALTER TABLE entradas ADD COLUMN huella TEXT")
+        if self._leer_metadato('version_huellas', 1) < VERSION_HUELLAS:
+            with self.conexion:
+                self._recalcular_huellas_rss()
+                self._escribir_metadato('version_huellas', VERSION_HUELLAS)
+
+    def _recalcular_huellas_rss(self, tamano_lote=500):
+        # Las filas sin huella se calculan al leerlas, ya con el cálculo vigente
+        ultimo = ''
+        while True:
+            filas = self.conexion.execute(
+                """SELECT id, datos, huella FROM entradas WHERE id > ? AND huella IS NOT NULL
+                   ORDER BY id LIMIT ?""", (ultimo, tamano_lote)).fetchall()
+            if not filas:
+                return
+            actualizadas = []
+            for id_entrada, datos, huella in filas:
+                huella = json.loads(huella)
+                huella['rss'] = huella_rss(json.loads(datos))
+                actualizadas.append((json.dumps(huella), id_entrada))
+            self.conexion.executemany("UPDATE entradas SET huella = ? WHERE id = ?", actualizadas)
+            ultimo = filas[-1][0]
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
+
+    def compactar(self):
+        """Recupera el espacio libre del archivo (VACUUM)"""
+        with self._lock:
+            self.conexion.execute("VACUUM")
+
+    def _fila(self, entrada):
+        contenido_xml = entrada.get('contenido_xml') or {}
+        departamento = contenido_xml.get('departamento') or entrada.get('departamento', '')
+        datos = externalizar_texto(
+            {clave: valor for clave, valor in entrada.items() if clave != 'huella'}, self.blobs)
+        return (
+            entrada['id'],
+            extraer_boe_id(entrada.get('id'), entrada.get('link')),
+            normalizar_fecha(entrada.get('fecha_publicacion')),
+            departamento,
+            json.dumps(datos, ensure_ascii=False),
+            json.dumps(entrada.get('huella') or calcular_huella(entrada)),
+            datetime.now().isoformat()
+        )
+
+    def guardar_entradas(self, entradas):
+        """Inserta o actualiza (upsert) un lote de entradas en una única transacción"""
+        with self._lock, self.conexion:
+            self.conexion.executemany(
+                """INSERT INTO entradas (id, boe_id, fecha_publicacion, departamento, datos, huella, actualizado)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       boe_id = excluded.boe_id,
+                       fecha_publicacion = excluded.fecha_publicacion,
+                       departamento = excluded.departamento,
+                       datos = excluded.datos,
+                       huella = excluded.huella,
+                       actualizado = excluded.actualizado""",
+                [self._fila(entrada) for entrada in entradas]
+            )
+
+    def guardar(self, entrada):
+        self.guardar_entradas([entrada])
+
+    def _datos(self, datos):
+        return texto_perezoso(json.loads(datos), self.blobs)
+
+    def obtener(self, id_entrada):
+        """Devuelve la entrada con ese id o None"""
+        return self.obtener_varias([id_entrada]).get(id_entrada)
+
+    def obtener_varias(self, ids):
+        """Devuelve un diccionario {id: entrada} con las entradas existentes"""
+        ids = list(ids)
+        resultado = {}
+        with self._lock:
+            # Consultas por bloques para no superar el límite de parámetros de SQLite
+            for inicio in range(0, len(ids), 500):
+                bloque = ids[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(bloque))
+                filas = self.conexion.execute(
+                    f"SELECT id, datos FROM entradas WHERE id IN ({marcadores})", bloque)
+                resultado.update((id_entrada, self._datos(datos)) for id_entrada, datos in filas)
+        return resultado
+
+    def obtener_huellas(self, ids):
+        """Devuelve {id: huella} sin cargar el texto de las entradas.
+
+        Las filas importadas sin huella se calculan una vez a partir de sus datos.
+        """
+        ids = list(ids)
+        resultado = {}
+        with self._lock:
+            for inicio in range(0, len(ids), 500):
+                bloque = ids[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(bloque))
+                filas = self.conexion.execute(
+                    f"""SELECT id, huella, CASE WHEN huella IS NULL THEN datos END
+                        FROM entradas WHERE id IN ({marcadores})""", bloque)
+                calculadas = []
+                for id_entrada, huella, datos in filas:
+                    if huella:
+                        resultado[id_entrada] = json.loads(huella)
+                    else:
+                        resultado[id_entrada] = calcular_huella(self._datos(datos))
+                        calculadas.append((json.dumps(resultado[id_entrada]), id_entrada))
+                if calculadas:
+                    # Se guardan para no recalcularlas en la próxima consulta
+                    with self.conexion:
+                        self.conexion.executemany(
+                            "UPDATE entradas SET huella = ? WHERE id = ?", calculadas)
+        return resultado
+
+    def iterar(self, tamano_lote=500):
+        """Recorre todas las entradas por lotes sin cargarlas todas en memoria"""
+        ultimo = ''
+        while True:
+            with self._lock:
+                filas = self.conexion.execute(
+                    "SELECT id, datos FROM entradas WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo, tamano_lote)).fetchall()
+            if not filas:
+                return
+            for id_entrada, datos in filas:
+                yield self._datos(datos)
+            ultimo = filas[-1][0]
+
+    def codigos_boe(self):
+        """Ids BOE de las entradas almacenadas como enteros (codificar_boe_id), sin cargar sus datos"""
+        with self._lock:
+            filas = self.conexion.execute(
+                "SELECT boe_id FROM entradas WHERE boe_id IS NOT NULL").fetchall()
+        return [codificar_boe_id(boe_id) for (boe_id,) in filas]
+
+    def marcar_revisadas(self, ids, instante):
+        """Anota en la huella el instante de la última revisión del XML sin reescribir la entrada"""
+        with self._lock, self.conexion:
+            self.conexion.executemany(
+                "UPDATE entradas SET huella = json_set(huella, '$.revisado', ?) WHERE id = ?",
+                [(instante, id_entrada) for id_entrada in ids])
+
+    def ultimas(self, n=5, departamento=None):
+        """Devuelve las n entradas más recientes por fecha de publicación"""
+        consulta = "SELECT datos FROM entradas"
+        parametros = []
+        if departamento:
+            consulta += " WHERE departamento = ?"
+            parametros.append(departamento)
+        consulta += " ORDER BY fecha_publicacion DESC, rowid DESC LIMIT ?"
+        parametros.append(n)
+        with self._lock:
+            filas = self.conexion.execute(consulta, parametros).fetchall()
+        return [self._datos(datos) for (datos,) in reversed(filas)]
+
+    def contar(self):
+        with self._lock:
+            return self.conexion.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+
+    def _leer_metadato(self, clave, por_defecto=None):
+        fila = self.conexion.execute(
+            "SELECT valor FROM metadatos WHERE clave = ?", (clave,)).fetchone()
+        return json.loads(fila[0]) if fila else por_defecto
+
+    def _escribir_metadato(self, clave, valor):
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES (?, ?)",
+            (clave, json.dumps(valor, ensure_ascii=False)))
+
+    def estadisticas(self):
+        """Devuelve total de entradas, entradas procesadas y fecha de la última actualización"""
+        with self._lock:
+            return {
+                'total_entradas': self.contar(),
+                'entradas_procesadas': self._leer_metadato('entradas_procesadas', 0),
+                'fecha_ultima_actualizacion': self._leer_metadato('fecha_ultima_actualizacion')
+            }
+
+    def registrar_actualizacion(self, entradas_nuevas):
+        """Acumula las entradas procesadas y marca la fecha de actualización"""
+        with self._lock, self.conexion:
+            procesadas = self._leer_metadato('entradas_procesadas', 0) + entradas_nuevas
+            self._escribir_metadato('entradas_procesadas', procesadas)
+            self._escribir_metadato('fecha_ultima_actualizacion', datetime.now().isoformat())
+        return self.estadisticas()
+
+    def importar_json(self, json_file):
+        """Importa de una vez el antiguo archivo datos_boe.json. Devuelve las entradas importadas"""
+        with open(json_file, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        entradas = [e for e in datos.get('ultimas_entradas', []) if e.get('id')]
+        self.guardar_entradas(entradas)
+        with self._lock, self.conexion:
+            estadisticas = datos.get('estadisticas', {})
+            self._escribir_metadato('entradas_procesadas',
+                                    estadisticas.get('entradas_procesadas', len(entradas)))
+            self._escribir_metadato('fecha_ultima_actualizacion',
+                                    datos.get('fecha_ultima_actualizacion'))
+        return len(entradas)
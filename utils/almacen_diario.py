@@ -0,0 +1,257 @@
+import glob
+import heapq
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from utils.huellas import calcular_huella, huella_rss, VERSION_HUELLAS
+from utils.blobs import externalizar_texto, texto_perezoso
+from utils.modelo import EntradaCompacta
+
+
+class _EntradaDiario(EntradaCompacta):
+    """Entrada del índice en memoria del diario: la compacta más su posición en disco"""
+
+    __slots__ = ('archivo', 'posicion')
+
+
+class AlmacenDiario:
+    """Almacén de entradas en un diario JSON Lines de solo anexado.
+
+    Cada ejecución añade al segmento activo únicamente las entradas nuevas o
+    modificadas. Periódicamente se compacta todo en `base.jsonl`, que se escribe
+    en un temporal y se sustituye con un rename atómico. Una línea incompleta
+    al final de un segmento (escritura interrumpida) se descarta al cargar.
+    Admite un único proceso escritor por directorio. Implementa la misma interfaz que AlmacenBOE.
+    """
+
+    BASE = 'base.jsonl'
+
+    def __init__(self, directorio, tamano_segmento=8 * 1024 * 1024, max_segmentos=8, blobs=None):
+        self.directorio = directorio
+        self.blobs = blobs
+        self.db_file = directorio
+        self.tamano_segmento = tamano_segmento
+        self.max_segmentos = max_segmentos
+        os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self._cargar()
+        self._migrar()
+
+    # --- Lectura del diario -------------------------------------------------
+
+    def _segmentos(self):
+        return sorted(glob.glob(os.path.join(self.directorio, 'diario-*.jsonl')))
+
+    def _cargar(self):
+        """Reconstruye el índice en memoria {id: _EntradaDiario}"""
+        self._indice = {}
+        self._metadatos = {}
+        archivos = [os.path.join(self.directorio, self.BASE)] + self._segmentos()
+        for archivo in archivos:
+            if os.path.exists(archivo):
+                self._leer_archivo(archivo)
+        segmentos = self._segmentos()
+        numero = int(segmentos[-1][-11:-6]) if segmentos else 1
+        self._segmento_activo = self._ruta_segmento(numero)
+
+    def _leer_archivo(self, archivo):
+        with open(archivo, 'rb') as f:
+            posicion = 0
+            for linea in f:
+                if not linea.endswith(b'\n'):
+                    # Escritura interrumpida: se descarta la línea incompleta
+                    self._truncar(archivo, posicion)
+                    break
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    self._truncar(archivo, posicion)
+                    break
+                self._aplicar(registro, archivo, posicion)
+                posicion += len(linea)
+
+    def _truncar(self, archivo, posicion):
+        with open(archivo, 'r+b') as f:
+            f.truncate(posicion)
+
+    def _aplicar(self, registro, archivo, posicion):
+        if registro.get('tipo') == 'meta':
+            self._metadatos[registro['clave']] = registro['valor']
+            return
+        if registro.get('tipo') == 'revision':
+            if registro['id'] in self._indice:
+                self._indice[registro['id']].revisado = registro['instante']
+            return
+        entrada = _EntradaDiario.desde_entrada(registro['datos'], registro['huella'])
+        entrada.archivo = sys.intern(archivo)
+        entrada.posicion = posicion
+        self._indice[entrada.id] = entrada
+
+    def _migrar(self):
+        """Recalcula la parte 'rss' de las huellas si cambió su cálculo (VERSION_HUELLAS)"""
+        if self._metadatos.get('version_huellas', 1) >= VERSION_HUELLAS:
+            return
+        with self._lock:
+            for entrada in self._indice.values():
+                huella = entrada.huella
+                if huella:
+                    huella['rss'] = huella_rss(self._leer_entrada(entrada.archivo, entrada.posicion))
+                    entrada.huella = huella
+            self._metadatos['version_huellas'] = VERSION_HUELLAS
+            self.compactar()
+
+    def _leer_entrada(self, archivo, posicion):
+        with open(archivo, 'rb') as f:
+            f.seek(posicion)
+            return texto_perezoso(json.loads(f.readline())['datos'], self.blobs)
+
+    # --- Escritura ----------------------------------------------------------
+
+    def _ruta_segmento(self, numero):
+        return os.path.join(self.directorio, f'diario-{numero:05d}.jsonl')
+
+    def _anexar(self, registros):
+        """Añade registros al segmento activo con fsync y actualiza el índice"""
+        if not registros:
+            return
+        with open(self._segmento_activo, 'ab') as f:
+            for registro in registros:
+                posicion = f.tell()
+                f.write(json.dumps(registro, ensure_ascii=False).encode('utf-8') + b'\n')
+                self._aplicar(registro, self._segmento_activo, posicion)
+            f.flush()
+            os.fsync(f.fileno())
+            tamano = f.tell()
+        if tamano >= self.tamano_segmento:
+            self._rotar()
+
+    def _rotar(self):
+        segmentos = self._segmentos()
+        if len(segmentos) >= self.max_segmentos:
+            self.compactar()
+        else:
+            numero = int(self._segmento_activo[-11:-6]) + 1
+            self._segmento_activo = self._ruta_segmento(numero)
+
+    def compactar(self):
+        """Reescribe el estado actual en base.jsonl (rename atómico) y elimina los segmentos"""
+        with self._lock:
+            base = os.path.join(self.directorio, self.BASE)
+            temporal = base + '.tmp'
+            with open(temporal, 'wb') as f:
+                for entrada in self._indice.values():
+                    datos = externalizar_texto(self._leer_entrada(entrada.archivo, entrada.posicion), self.blobs)
+                    registro = {'tipo': 'entrada', 'datos': datos, 'huella': entrada.huella}
+                    f.write(json.dumps(registro, ensure_ascii=False).encode('utf-8') + b'\n')
+                for clave, valor in self._metadatos.items():
+                    registro = {'tipo': 'meta', 'clave': clave, 'valor': valor}
+                    f.write(json.dumps(registro, ensure_ascii=False).encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, base)
+            # Si se interrumpe aquí, reaplicar los segmentos sobre la base nueva es idempotente
+            for segmento in self._segmentos():
+                os.remove(segmento)
+            self._cargar()
+
+    # --- Interfaz del repositorio --------------------------------------------
+
+    def cerrar(self):
+        pass
+
+    def guardar_entradas(self, entradas):
+        registros = []
+        for entrada in entradas:
+            datos = externalizar_texto(
+                {clave: valor for clave, valor in entrada.items() if clave != 'huella'}, self.blobs)
+            registros.append({'tipo': 'entrada', 'datos': datos,
+                              'huella': entrada.get('huella') or calcular_huella(entrada)})
+        with self._lock:
+            self._anexar(registros)
+
+    def guardar(self, entrada):
+        self.guardar_entradas([entrada])
+
+    def obtener(self, id_entrada):
+        return self.obtener_varias([id_entrada]).get(id_entrada)
+
+    def obtener_varias(self, ids):
+        with self._lock:
+            return {id_entrada: self._leer_entrada(self._indice[id_entrada].archivo,
+                                                   self._indice[id_entrada].posicion)
+                    for id_entrada in ids if id_entrada in self._indice}
+
+    def obtener_huellas(self, ids):
+        with self._lock:
+            return {id_entrada: self._indice[id_entrada].huella
+                    for id_entrada in ids if id_entrada in self._indice}
+
+    def codigos_boe(self):
+        """Ids BOE de las entradas almacenadas como enteros (codificar_boe_id)"""
+        with self._lock:
+            return [entrada.boe_id for entrada in self._indice.values() if entrada.boe_id is not None]
+
+    def marcar_revisadas(self, ids, instante):
+        with self._lock:
+            self._anexar([{'tipo': 'revision', 'id': id_entrada, 'instante': instante}
+                          for id_entrada in ids if id_entrada in self._indice])
+
+    def iterar(self, tamano_lote=500):
+        """Recorre las entradas por lotes; cada lote se lee con las posiciones vigentes,
+        así que admite que se guarde (y se compacte el diario) mientras se recorre"""
+        with self._lock:
+            ids = list(self._indice)
+        for inicio in range(0, len(ids), tamano_lote):
+            with self._lock:
+                lote = [self._leer_entrada(entrada.archivo, entrada.posicion)
+                        for entrada in map(self._indice.get, ids[inicio:inicio + tamano_lote])
+                        if entrada is not None]
+            yield from lote
+
+    def ultimas(self, n=5, departamento=None):
+        with self._lock:
+            candidatos = ((entrada.fecha_publicacion, entrada.id) for entrada in self._indice.values()
+                          if not departamento or entrada.departamento == departamento)
+            recientes = heapq.nlargest(n, candidatos)
+            return [self._leer_entrada(self._indice[id_entrada].archivo, self._indice[id_entrada].posicion)
+                    for _, id_entrada in reversed(recientes)]
+
+    def contar(self):
+        with self._lock:
+            return len(self._indice)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'total_entradas': len(self._indice),
+                'entradas_procesadas': self._metadatos.get('entradas_procesadas', 0),
+                'fecha_ultima_actualizacion': self._metadatos.get('fecha_ultima_actualizacion')
+            }
+
+    def registrar_actualizacion(self, entradas_nuevas):
+        with self._lock:
+            procesadas = self._metadatos.get('entradas_procesadas', 0) + entradas_nuevas
+            self._anexar([
+                {'tipo': 'meta', 'clave': 'entradas_procesadas', 'valor': procesadas},
+                {'tipo': 'meta', 'clave': 'fecha_ultima_actualizacion',
+                 'valor': datetime.now().isoformat()}
+            ])
+            return self.estadisticas()
+
+    def importar_json(self, json_file):
+        with open(json_file, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        entradas = [e for e in datos.get('ultimas_entradas', []) if e.get('id')]
+        estadisticas = datos.get('estadisticas', {})
+        with self._lock:
+            self.guardar_entradas(entradas)
+            self._anexar([
+                {'tipo': 'meta', 'clave': 'entradas_procesadas',
+                 'valor': estadisticas.get('entradas_procesadas', len(entradas))},
+                {'tipo': 'meta', 'clave': 'fecha_ultima_actualizacion',
+                 'valor': datos.get('fecha_ultima_actualizacion')}
+            ])
+            self.compactar()
+        return len(entradas)
@@ -0,0 +1,155 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: sin él se comprime con gzip
+    zstandard = None
+
+PREFIJO_REFERENCIA = 'blake2b:'
+
+
+class AlmacenBlobs:
+    """Almacén de textos direccionado por contenido.
+
+    Cada texto se guarda comprimido (zstd si está instalado, si no gzip) en
+    un archivo cuyo nombre es el hash de su contenido, de modo que los textos
+    idénticos (p. ej. varias versiones sin cambios) se guardan una sola vez.
+    Las entradas solo guardan la referencia devuelta por guardar().
+    """
+
+    def __init__(self, directorio, tamano_cache=64):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self.extension = '.zst' if zstandard else '.gz'
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.tamano_cache = tamano_cache
+
+    @staticmethod
+    def referencia(texto):
+        return PREFIJO_REFERENCIA + hashlib.blake2b(texto.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _ruta(self, referencia, extension):
+        resumen = referencia[len(PREFIJO_REFERENCIA):]
+        return os.path.join(self.directorio, resumen[:2], resumen[2:] + extension)
+
+    def guardar(self, texto):
+        """Guarda el texto si no existe ya y devuelve su referencia"""
+        referencia = self.referencia(texto)
+        if self.existe(referencia):
+            return referencia
+        ruta = self._ruta(referencia, self.extension)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        datos = texto.encode('utf-8')
+        if zstandard:
+            comprimido = zstandard.ZstdCompressor(level=10).compress(datos)
+        else:
+            comprimido = gzip.compress(datos, compresslevel=6, mtime=0)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(comprimido)
+        os.replace(temporal, ruta)
+        return referencia
+
+    def existe(self, referencia):
+        return any(os.path.exists(self._ruta(referencia, extension)) for extension in ('.zst', '.gz'))
+
+    def cargar(self, referencia):
+        """Devuelve el texto de la referencia (con una pequeña caché LRU)"""
+        with self._lock:
+            if referencia in self._cache:
+                self._cache.move_to_end(referencia)
+                return self._cache[referencia]
+        ruta = self._ruta(referencia, '.zst')
+        if os.path.exists(ruta):
+            if zstandard is None:
+                raise RuntimeError(f"Hace falta el paquete zstandard para leer {ruta}")
+            with open(ruta, 'rb') as f:
+                texto = zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+        else:
+            with open(self._ruta(referencia, '.gz'), 'rb') as f:
+                texto = gzip.decompress(f.read()).decode('utf-8')
+        with self._lock:
+            self._cache[referencia] = texto
+            if len(self._cache) > self.tamano_cache:
+                self._cache.popitem(last=False)
+        return texto
+
+
+class ContenidoPerezoso(dict):
+    """contenido_xml cuyo 'texto' se lee del almacén de blobs la primera vez que se usa"""
+
+    def __init__(self, datos, blobs):
+        super().__init__(datos)
+        self._blobs = blobs
+
+    def __missing__(self, clave):
+        if clave == 'texto' and dict.__contains__(self, 'texto_ref'):
+            texto = self._blobs.cargar(dict.__getitem__(self, 'texto_ref'))
+            dict.__setitem__(self, 'texto', texto)
+            return texto
+        raise KeyError(clave)
+
+    def __contains__(self, clave):
+        return dict.__contains__(self, clave) or (clave == 'texto' and dict.__contains__(self, 'texto_ref'))
+
+    def get(self, clave, por_defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return por_defecto
+
+
+def externalizar_texto(datos, blobs):
+    """Copia de los datos de una entrada con el texto del documento sustituido por su referencia"""
+    contenido_xml = datos.get('contenido_xml')
+    if blobs is None or not isinstance(contenido_xml, dict):
+        return datos
+    texto = dict.get(contenido_xml, 'texto')
+    if texto is None:
+        # Sin cargar: se conserva la referencia que ya tenía
+        return {**datos, 'contenido_xml': dict(contenido_xml)}
+    contenido = {clave: valor for clave, valor in contenido_xml.items() if clave != 'texto'}
+    contenido['texto_ref'] = blobs.guardar(texto)
+    return {**datos, 'contenido_xml': contenido}
+
+
+def externalizar_almacen(almacen, tamano_lote=500):
+    """Pasa al almacén de blobs los textos guardados en línea por versiones anteriores.
+
+    Devuelve el número de entradas reescritas (con su huella intacta).
+    """
+    total = 0
+    lote = []
+
+    def reescribir():
+        huellas = almacen.obtener_huellas(entrada['id'] for entrada in lote)
+        for entrada in lote:
+            entrada['huella'] = huellas.get(entrada['id'])
+        almacen.guardar_entradas(lote)
+
+    for entrada in almacen.iterar(tamano_lote):
+        contenido_xml = entrada.get('contenido_xml')
+        if isinstance(contenido_xml, dict) and dict.get(contenido_xml, 'texto') is not None \
+                and not isinstance(contenido_xml, ContenidoPerezoso):
+            lote.append(entrada)
+        if len(lote) >= tamano_lote:
+            reescribir()
+            total += len(lote)
+            lote = []
+    if lote:
+        reescribir()
+        total += len(lote)
+    return total
+
+
+def texto_perezoso(datos, blobs):
+    """Envuelve el contenido_xml de una entrada leída para cargar su texto bajo demanda"""
+    contenido_xml = datos.get('contenido_xml')
+    if blobs is not None and isinstance(contenido_xml, dict) and 'texto_ref' in contenido_xml:
+        datos['contenido_xml'] = ContenidoPerezoso(contenido_xml, blobs)
+    return datos
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheHTTP:
+    """Caché persistente de validadores HTTP (ETag / Last-Modified) por URL.
+
+    Guarda como mucho `maximo` URLs y descarta las usadas hace más tiempo; el
+    archivo conserva ese orden, de modo que se mantiene entre ejecuciones. Se
+    escribe con guardar(), una vez por ciclo.
+    """
+
+    def __init__(self, cache_file, maximo=20000):
+        self.cache_file = cache_file
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._modificado = False
+        self._validadores = self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                validadores = OrderedDict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return OrderedDict()
+        while len(validadores) > self.maximo:
+            validadores.popitem(last=False)
+        return validadores
+
+    def _usar(self, url):
+        """Validador de la URL (o {}), marcándola como usada recientemente"""
+        validador = self._validadores.get(url)
+        if validador is None:
+            return {}
+        self._validadores.move_to_end(url)
+        return validador
+
+    def cabeceras_condicionales(self, url):
+        """Devuelve las cabeceras If-None-Match / If-Modified-Since para la URL"""
+        with self._lock:
+            validador = self._usar(url)
+        cabeceras = {}
+        if validador.get('etag'):
+            cabeceras['If-None-Match'] = validador['etag']
+        if validador.get('last_modified'):
+            cabeceras['If-Modified-Since'] = validador['last_modified']
+        return cabeceras
+
+    def registrar(self, url, response):
+        """Guarda los validadores de una respuesta 200 ya procesada correctamente.
+
+        Sustituye también la marca de descarte: el documento nuevo no se ha evaluado.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            if etag or last_modified:
+                self._validadores[url] = {'etag': etag, 'last_modified': last_modified}
+                self._validadores.move_to_end(url)
+                while len(self._validadores) > self.maximo:
+                    self._validadores.popitem(last=False)
+                self._modificado = True
+            elif self._validadores.pop(url, None) is not None:
+                self._modificado = True
+
+    def marcar_descartado(self, url, huella_reglas):
+        """Anota que el documento vigente de la URL no cumple las reglas con esa huella"""
+        with self._lock:
+            if url in self._validadores:
+                self._validadores[url]['descartado'] = huella_reglas
+                self._modificado = True
+
+    def descartado(self, url, huella_reglas):
+        """Indica si el documento de la URL se descartó con las mismas reglas"""
+        with self._lock:
+            return self._usar(url).get('descartado') == huella_reglas
+
+    def guardar(self):
+        """Escribe la caché en disco de forma atómica si ha cambiado"""
+        with self._lock:
+            if not self._modificado:
+                return
+            directorio = os.path.dirname(self.cache_file)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.cache_file}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._validadores, f, ensure_ascii=False)
+            os.replace(temporal, self.cache_file)
+            self._modificado = False
+
+
+# Marca devuelta cuando el servidor responde 304 Not Modified
+NO_MODIFICADO = object()
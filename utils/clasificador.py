@@ -0,0 +1,184 @@
+import math
+import re
+from collections import Counter
+from utils.coincidencias import normalizar
+
+CATEGORIA_POR_DEFECTO = 'General'
+DEPARTAMENTO_POR_DEFECTO = 'No especificado'
+
+PALABRAS_VACIAS = frozenset(
+    'a al como con de del e el en la las lo los o para por que se su sus u un una y'.split())
+
+# Plurales frecuentes → singular, para que "ayudas" y "ayuda" cuenten como el mismo término
+PLURALES = [('iones', 'ion'), ('ales', 'al'), ('s', '')]
+
+_PALABRAS = re.compile(r'\w+')
+
+
+def _singular(palabra):
+    if len(palabra) > 3:
+        for plural, singular in PLURALES:
+            if palabra.endswith(plural):
+                return palabra[:-len(plural)] + singular
+    return palabra
+
+
+def _numpy():
+    """NumPy si está instalado; es opcional y sin él se puntúa con diccionarios"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def terminos(texto):
+    """Palabras (en singular) y pares de palabras consecutivas del texto normalizado, sin palabras vacías"""
+    palabras = [_singular(palabra) for palabra in _PALABRAS.findall(normalizar(texto))
+                if palabra not in PALABRAS_VACIAS]
+    return palabras + [f"{primera} {segunda}" for primera, segunda in zip(palabras, palabras[1:])]
+
+
+class PerfilesTFIDF:
+    """Puntúa lotes de textos contra perfiles de términos por similitud coseno TF-IDF.
+
+    Cada perfil (etiqueta → lista de términos) es un vector de pesos sobre el
+    vocabulario de todos los perfiles; el IDF se calcula entre perfiles, de modo
+    que los términos comunes a muchos (p. ej. "ministerio") apenas distinguen.
+    Con NumPy (opcional) los perfiles forman una matriz densa y los términos de
+    todos los textos se puntúan a la vez, sumando por texto con bincount; sin
+    NumPy se recorren con diccionarios y el resultado es el mismo.
+    """
+
+    def __init__(self, perfiles):
+        self.etiquetas = list(perfiles)
+        self.vocabulario = {}
+        cuentas = []
+        for etiqueta in self.etiquetas:
+            cuenta = Counter()
+            for termino in perfiles[etiqueta]:
+                cuenta.update(terminos(termino))
+            for termino in cuenta:
+                self.vocabulario.setdefault(termino, len(self.vocabulario))
+            cuentas.append(cuenta)
+        frecuencia = Counter(termino for cuenta in cuentas for termino in cuenta)
+        self.idf = {termino: math.log((1 + len(cuentas)) / (1 + frecuencia[termino])) + 1
+                    for termino in self.vocabulario}
+        self._perfiles = [self._vector(cuenta) for cuenta in cuentas]
+        # Se construye al puntuar por primera vez (False si no hay NumPy)
+        self._matriz = None
+
+    def _matriz_perfiles(self):
+        """Matriz densa perfiles × vocabulario, o None sin NumPy"""
+        if self._matriz is None:
+            numpy = _numpy()
+            matriz = False
+            if numpy is not None and self.vocabulario:
+                matriz = numpy.zeros((len(self.etiquetas), len(self.vocabulario)))
+                for fila, perfil in enumerate(self._perfiles):
+                    for termino, peso in perfil.items():
+                        matriz[fila, self.vocabulario[termino]] = peso
+            self._matriz = matriz
+        return self._matriz if self._matriz is not False else None
+
+    def _vector(self, cuenta):
+        """Pesos TF-IDF (frecuencia sublineal) normalizados a norma 1"""
+        pesos = {termino: (1 + math.log(veces)) * self.idf[termino] for termino, veces in cuenta.items()}
+        norma = math.sqrt(sum(peso * peso for peso in pesos.values()))
+        return {termino: peso / norma for termino, peso in pesos.items()} if norma else {}
+
+    def puntuar(self, textos):
+        """Devuelve [(etiqueta o None, puntuación)] con el perfil más parecido a cada texto"""
+        return self.puntuar_terminos(terminos(texto) for texto in textos)
+
+    def puntuar_terminos(self, listas_terminos):
+        """Como puntuar, con los textos ya convertidos en términos"""
+        cuentas = [Counter(termino for termino in lista if termino in self.vocabulario)
+                   for lista in listas_terminos]
+        if not self.etiquetas:
+            return [(None, 0.0)] * len(cuentas)
+        matriz = self._matriz_perfiles()
+        if matriz is not None:
+            return self._puntuar_numpy(matriz, cuentas)
+        resultados = []
+        for cuenta in cuentas:
+            vector = self._vector(cuenta)
+            puntuaciones = [sum(peso * perfil.get(termino, 0.0) for termino, peso in vector.items())
+                            for perfil in self._perfiles]
+            mejor = max(range(len(puntuaciones)), key=puntuaciones.__getitem__)
+            resultados.append((self.etiquetas[mejor] if puntuaciones[mejor] > 0 else None,
+                               float(puntuaciones[mejor])))
+        return resultados
+
+    def _puntuar_numpy(self, matriz, cuentas):
+        numpy = _numpy()
+        longitudes = numpy.fromiter((len(cuenta) for cuenta in cuentas), dtype=numpy.int64, count=len(cuentas))
+        filas = numpy.repeat(numpy.arange(len(cuentas)), longitudes)
+        columnas = numpy.fromiter((self.vocabulario[termino] for cuenta in cuentas for termino in cuenta),
+                                  dtype=numpy.int64, count=len(filas))
+        veces = numpy.fromiter((veces for cuenta in cuentas for veces in cuenta.values()),
+                               dtype=numpy.float64, count=len(filas))
+        idf = numpy.fromiter(self.idf.values(), dtype=numpy.float64, count=len(self.idf))
+        pesos = (1 + numpy.log(veces)) * idf[columnas]
+        normas = numpy.sqrt(numpy.bincount(filas, weights=pesos * pesos, minlength=len(cuentas)))
+        # Producto disperso × denso: cada término suma su peso por el del perfil en su fila
+        contribuciones = matriz[:, columnas] * pesos
+        puntuaciones = numpy.stack([numpy.bincount(filas, weights=contribucion, minlength=len(cuentas))
+                                    for contribucion in contribuciones], axis=1)
+        puntuaciones /= numpy.where(normas > 0, normas, 1.0)[:, None]
+        mejores = puntuaciones.argmax(axis=1)
+        maximos = puntuaciones[numpy.arange(len(cuentas)), mejores]
+        return [(self.etiquetas[mejor] if maximo > 0 else None, float(maximo))
+                for mejor, maximo in zip(mejores.tolist(), maximos.tolist())]
+
+
+class ClasificadorEntradas:
+    """Asigna categoría, departamento estimado y relevancia a lotes de entradas del BOE.
+
+    Las categorías salen de "categorias" en config/inclusiones.json (o, si no
+    hay, una por palabra clave de inclusiones.json) más una por cada keyword de
+    config.json no incluida en ellas; los departamentos, de "departamentos_incluidos".
+    El departamento es una aproximación por parecido de términos: se guarda en
+    'departamento_estimado' y no sustituye al del RSS ni al del XML, que son
+    los que usan el filtro y los avisos.
+    """
+
+    def __init__(self, categorias=None, departamentos=None, umbral_categoria=0.1,
+                 umbral_departamento=0.5):
+        self.categorias = PerfilesTFIDF(categorias or {})
+        self.departamentos = PerfilesTFIDF(departamentos or {})
+        self.umbral_categoria = umbral_categoria
+        self.umbral_departamento = umbral_departamento
+
+    @classmethod
+    def desde_configuracion(cls, inclusiones, keywords=(), **umbrales):
+        categorias = {categoria: list(lista) for categoria, lista in inclusiones.get('categorias', {}).items()}
+        clasificados = {normalizar(termino) for lista in categorias.values() for termino in lista}
+        terminos_clave = [] if categorias else list(inclusiones.get('palabras_clave_incluidas', []))
+        # Las palabras clave sin categoría asignada forman una categoría propia
+        for termino in dict.fromkeys(terminos_clave + list(keywords)):
+            if normalizar(termino) not in clasificados:
+                categorias[normalizar(termino).replace(' ', '_')] = [termino]
+        departamentos = {nombre: [nombre] for nombre in inclusiones.get('departamentos_incluidos', [])}
+        return cls(categorias, departamentos, **umbrales)
+
+    def clasificar(self, textos):
+        """Devuelve [{'categoria', 'departamento_estimado', 'relevancia'}] para cada texto"""
+        listas = [terminos(texto) for texto in textos]
+        resultados = []
+        for (categoria, relevancia), (departamento, afinidad) in zip(
+                self.categorias.puntuar_terminos(listas), self.departamentos.puntuar_terminos(listas)):
+            resultados.append({
+                'categoria': categoria if relevancia >= self.umbral_categoria else CATEGORIA_POR_DEFECTO,
+                'departamento_estimado': (departamento if afinidad >= self.umbral_departamento
+                                          else DEPARTAMENTO_POR_DEFECTO),
+                'relevancia': round(relevancia, 3)
+            })
+        return resultados
+
+    def clasificar_entradas(self, entradas):
+        """Clasifica las entradas por su título y descripción y les añade los resultados"""
+        textos = [f"{entrada.get('titulo', '')}\n{entrada.get('descripcion', '')}" for entrada in entradas]
+        for entrada, resultado in zip(entradas, self.clasificar(textos)):
+            entrada.update(resultado)
+        return entradas
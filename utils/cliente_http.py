@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metricas import METRICAS
+
+# Respuestas tras las que merece la pena reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Resultado de una descarga que ha fallado por un problema transitorio (servidor
+# degradado, circuito abierto...): la entrada debe reintentarse más adelante
+PENDIENTE = object()
+
+
+class CircuitoAbierto(requests.RequestException):
+    """El host está en pausa tras demasiados fallos seguidos"""
+
+
+def segundos_retry_after(valor):
+    """Interpreta la cabecera Retry-After (segundos o fecha HTTP). Devuelve None si no es válida"""
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+
+
+class Cortacircuitos:
+    """Cortacircuitos por host.
+
+    Tras `umbral_fallos` fallos seguidos el host queda en pausa durante
+    `pausa` segundos; después se deja pasar una única petición de prueba y,
+    si tiene éxito, el circuito se cierra de nuevo.
+    """
+
+    def __init__(self, umbral_fallos=5, pausa=120):
+        self.umbral_fallos = umbral_fallos
+        self.pausa = pausa
+        self._lock = threading.Lock()
+        self._fallos = {}
+        self._abierto_hasta = {}
+        self._probando = set()
+
+    def permitir(self, host):
+        """Indica si se puede lanzar una petición al host"""
+        with self._lock:
+            hasta = self._abierto_hasta.get(host)
+            if hasta is None:
+                return True
+            if time.monotonic() < hasta or host in self._probando:
+                return False
+            self._probando.add(host)
+            return True
+
+    def disponible(self, host):
+        """Como permitir, pero sin reservar la petición de prueba"""
+        with self._lock:
+            hasta = self._abierto_hasta.get(host)
+            return hasta is None or (time.monotonic() >= hasta and host not in self._probando)
+
+    def registrar_exito(self, host):
+        with self._lock:
+            self._fallos.pop(host, None)
+            self._abierto_hasta.pop(host, None)
+            self._probando.discard(host)
+
+    def liberar(self, host):
+        """Libera la petición de prueba sin registrar éxito ni fallo"""
+        with self._lock:
+            self._probando.discard(host)
+
+    def registrar_fallo(self, host, pausa=None):
+        """Anota un fallo; abre el circuito al alcanzar el umbral o si se indica una pausa"""
+        with self._lock:
+            self._probando.discard(host)
+            self._fallos[host] = self._fallos.get(host, 0) + 1
+            if pausa is None and self._fallos[host] < self.umbral_fallos and host not in self._abierto_hasta:
+                return False
+            pausa = max(pausa or 0.0, self.pausa if self._fallos[host] >= self.umbral_fallos else 0.0)
+            self._abierto_hasta[host] = time.monotonic() + pausa
+        METRICAS.contar('http_circuito_abierto_total', host=host)
+        return True
+
+
+class ClienteHTTP:
+    """Sesión HTTP compartida con reintentos, espera exponencial y cortacircuitos.
+
+    Reintenta ante timeouts, errores de conexión y respuestas 429/5xx con
+    espera exponencial con jitter (o la indicada en Retry-After). Si un host
+    acumula fallos seguidos se deja de consultar durante un tiempo y las
+    peticiones fallan de inmediato con CircuitoAbierto.
+    """
+
+    def __init__(self, max_conexiones=8, headers=None, reintentos=3, espera_base=0.5,
+                 espera_maxima=60.0, timeout=10, umbral_fallos=5, pausa_circuito=120):
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.timeout = timeout
+        self.cortacircuitos = Cortacircuitos(umbral_fallos, pausa_circuito)
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones,
+                                pool_block=True)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+        if headers:
+            self.session.headers.update(headers)
+
+    def disponible(self, url):
+        """Indica si el circuito del host de la URL permite peticiones"""
+        return self.cortacircuitos.disponible(urlparse(url).netloc)
+
+    def _espera(self, intento, response=None):
+        retry_after = segundos_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.espera_maxima)
+        espera = min(self.espera_maxima, self.espera_base * 2 ** intento)
+        # Jitter: la mitad fija y la otra mitad aleatoria para no sincronizar los reintentos
+        return espera / 2 + random.uniform(0, espera / 2)
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        """GET con reintentos. Devuelve la última respuesta (que puede ser un 429/5xx)
+        o lanza la última excepción de red o CircuitoAbierto"""
+        host = urlparse(url).netloc
+        timeout = timeout or self.timeout
+        for intento in range(self.reintentos + 1):
+            if not self.cortacircuitos.permitir(host):
+                raise CircuitoAbierto(f"Circuito abierto para {host}")
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.cortacircuitos.registrar_fallo(host)
+                METRICAS.contar('http_fallos_total', motivo=type(e).__name__)
+                if intento == self.reintentos:
+                    raise
+                time.sleep(self._espera(intento))
+                METRICAS.contar('http_reintentos_total')
+                continue
+            except requests.RequestException:
+                # Errores no transitorios (URL inválida, redirecciones...): no cuentan como fallo del host
+                self.cortacircuitos.liberar(host)
+                raise
+
+            if response.status_code not in ESTADOS_REINTENTABLES:
+                self.cortacircuitos.registrar_exito(host)
+                return response
+
+            METRICAS.contar('http_fallos_total', motivo=str(response.status_code))
+            retry_after = segundos_retry_after(response.headers.get('Retry-After'))
+            # Un Retry-After más largo que la espera máxima pausa todo el host
+            self.cortacircuitos.registrar_fallo(
+                host, pausa=retry_after if retry_after and retry_after > self.espera_maxima else None)
+            if intento == self.reintentos:
+                return response
+            espera = self._espera(intento, response)
+            response.close()
+            time.sleep(espera)
+            METRICAS.contar('http_reintentos_total')
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import unicodedata
+from utils.huellas import huella_texto
+
+# Tabla de traducción que elimina tildes y diéresis de los caracteres latinos
+_SIN_TILDES = {
+    codigo: unicodedata.normalize('NFD', chr(codigo))[0]
+    for codigo in range(0xC0, 0x250)
+    if len(unicodedata.normalize('NFD', chr(codigo))) > 1
+}
+
+EXCLUSIONES_TITULO = ['universidad', 'corrección de errores', 'fe de erratas']
+
+# Resultados de la preclasificación con los metadatos del RSS
+INCLUIDA = 'incluida'
+EXCLUIDA = 'excluida'
+TEXTO_COMPLETO = 'texto_completo'
+
+REGLAS = {
+    'departamentos': 'departamentos_incluidos',
+    'palabras_clave': 'palabras_clave_incluidas',
+    'rangos': 'rangos_incluidos'
+}
+
+
+def normalizar(texto):
+    """Pasa a minúsculas y elimina tildes para comparar sin distinguir acentos"""
+    return (texto or '').lower().translate(_SIN_TILDES)
+
+
+class BuscadorTerminos:
+    """Autómata de búsqueda de muchos términos en una sola pasada por el texto.
+
+    Compila una única expresión regular con todos los términos (del más largo
+    al más corto) dentro de una búsqueda anticipada, de forma que se detectan
+    también coincidencias solapadas. En cada posición el motor devuelve el
+    término más largo; los términos más cortos que empiezan en la misma
+    posición son prefijos de él y se resuelven con una tabla precalculada.
+    """
+
+    def __init__(self, terminos_por_grupo):
+        self._grupos = {}
+        for grupo, terminos in terminos_por_grupo.items():
+            for termino in terminos:
+                clave = normalizar(termino).strip()
+                if clave:
+                    self._grupos.setdefault(clave, []).append((grupo, termino))
+        claves = sorted(self._grupos, key=len, reverse=True)
+        self._prefijos = {
+            clave: [otra for otra in claves if clave.startswith(otra)]
+            for clave in claves
+        }
+        self._patron = (re.compile('(?=(' + '|'.join(map(re.escape, claves)) + '))')
+                        if claves else None)
+
+    def buscar(self, texto, normalizado=False):
+        """Devuelve {grupo: [términos originales encontrados]}"""
+        resultado = {}
+        if self._patron is None:
+            return resultado
+        if not normalizado:
+            texto = normalizar(texto)
+        vistas = set()
+        for coincidencia in self._patron.finditer(texto):
+            clave = coincidencia.group(1)
+            if clave in vistas:
+                continue
+            for prefijo in self._prefijos[clave]:
+                if prefijo in vistas:
+                    continue
+                vistas.add(prefijo)
+                for grupo, termino in self._grupos[prefijo]:
+                    resultado.setdefault(grupo, []).append(termino)
+        return resultado
+
+
+class BuscadorInclusiones:
+    """Aplica las reglas de config/inclusiones.json con autómatas precompilados"""
+
+    def __init__(self, inclusiones, exclusiones_titulo=EXCLUSIONES_TITULO):
+        self.inclusiones = inclusiones
+        self._terminos = BuscadorTerminos({
+            regla: inclusiones.get(clave, []) for regla, clave in REGLAS.items()
+        })
+        self._exclusiones = BuscadorTerminos({'exclusiones': exclusiones_titulo})
+        self._secciones_excluidas = BuscadorTerminos(
+            {'secciones': inclusiones.get('secciones_excluidas', [])})
+        self.buscar_en_texto_completo = inclusiones.get('buscar_en_texto_completo', True)
+        # Identifica las reglas vigentes: los descartes anotados con otra huella se reevalúan
+        self.huella = huella_texto(json.dumps([inclusiones, exclusiones_titulo], sort_keys=True,
+                                              ensure_ascii=False))
+
+    def texto_busqueda(self, entrada):
+        contenido_xml = entrada.get('contenido_xml') or {}
+        return ' '.join(filter(None, [
+            entrada.get('titulo', ''),
+            entrada.get('descripcion', ''),
+            entrada.get('departamento', ''),
+            contenido_xml.get('texto', ''),
+            contenido_xml.get('departamento', '')
+        ]))
+
+    def excluida(self, entrada):
+        """Indica si el título contiene algún término excluido"""
+        return bool(self._exclusiones.buscar(entrada.get('titulo', '')))
+
+    def preclasificar(self, entrada):
+        """Primera etapa del filtro, solo con los metadatos del RSS.
+
+        Devuelve (INCLUIDA, (regla, coincidencias)) si ya cumple algún criterio,
+        (EXCLUIDA, None) si nunca podrá cumplirlos (título o sección excluidos) y
+        (TEXTO_COMPLETO, None) si hace falta el texto del documento para decidir.
+        """
+        if self.excluida(entrada) or self._secciones_excluidas.buscar(entrada.get('descripcion', '')):
+            return EXCLUIDA, None
+        resultado = self.evaluar(entrada)
+        if resultado:
+            return INCLUIDA, resultado
+        return (TEXTO_COMPLETO if self.buscar_en_texto_completo else EXCLUIDA), None
+
+    def evaluar(self, entrada):
+        """Devuelve (regla, coincidencias) si la entrada cumple algún criterio o None.
+
+        Las reglas son: departamento incluido, palabra clave incluida o rango
+        incluido junto a un departamento incluido.
+        """
+        if self.excluida(entrada):
+            return None
+        coincidencias = self._terminos.buscar(self.texto_busqueda(entrada))
+        if 'departamentos' in coincidencias:
+            return 'departamento', coincidencias
+        if 'palabras_clave' in coincidencias:
+            return 'palabra_clave', coincidencias
+        return None
+
+
+class RecargadorInclusiones:
+    """Mantiene compilado el BuscadorInclusiones y lo reconstruye si cambia el archivo.
+
+    `al_recargar(inclusiones)`, si se indica, se llama en cada recarga para
+    reconstruir lo que también depende del archivo (p. ej. el clasificador).
+    """
+
+    def __init__(self, inclusiones_file, cargar, al_recargar=None):
+        self.inclusiones_file = inclusiones_file
+        self._cargar = cargar
+        self._al_recargar = al_recargar
+        self._mtime = None
+        self._buscador = None
+
+    def _mtime_actual(self):
+        try:
+            return os.stat(self.inclusiones_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def actual(self):
+        """Devuelve el buscador vigente, recompilándolo solo si el archivo se ha modificado"""
+        mtime = self._mtime_actual()
+        if self._buscador is None or mtime != self._mtime:
+            inclusiones = self._cargar(self.inclusiones_file)
+            self._buscador = BuscadorInclusiones(inclusiones)
+            if self._al_recargar:
+                self._al_recargar(inclusiones)
+            self._mtime = mtime
+        return self._buscador
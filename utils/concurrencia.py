@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+
+class LimitadorPorHost:
+    """Limita las peticiones simultáneas y el ritmo de peticiones por host"""
+
+    def __init__(self, max_por_host=4, intervalo_minimo=0.0):
+        self.max_por_host = max_por_host
+        self.intervalo_minimo = intervalo_minimo
+        self._lock = threading.Lock()
+        self._semaforos = {}
+        self._ultima_peticion = {}
+
+    def _semaforo(self, host):
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos[host]
+
+    def _esperar_turno(self, host):
+        """Respeta el intervalo mínimo entre peticiones consecutivas al mismo host"""
+        if self.intervalo_minimo <= 0:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            siguiente = max(ahora, self._ultima_peticion.get(host, 0.0) + self.intervalo_minimo)
+            self._ultima_peticion[host] = siguiente
+        espera = siguiente - ahora
+        if espera > 0:
+            time.sleep(espera)
+
+    def ejecutar(self, url, funcion, *args, **kwargs):
+        """Ejecuta la función respetando los límites del host de la URL"""
+        host = urlparse(url).netloc
+        with self._semaforo(host):
+            self._esperar_turno(host)
+            return funcion(*args, **kwargs)
+
+
+class RegistroDescargas:
+    """Comparte entre monitores las descargas de un mismo documento en un ciclo.
+
+    Cada documento (clave, normalmente el id BOE) se descarga una sola vez
+    hasta que se llama a limpiar() (al terminar cada ciclo del planificador);
+    las peticiones posteriores reutilizan el futuro existente. Las descargas
+    fallidas (None, excepción o un valor de `no_reutilizar`) no se reutilizan.
+    """
+
+    def __init__(self, no_reutilizar=()):
+        self.no_reutilizar = no_reutilizar
+        self._lock = threading.Lock()
+        self._futuros = {}
+
+    def _reutilizable(self, futuro):
+        if not futuro.done():
+            return True
+        if futuro.exception() is not None:
+            return False
+        resultado = futuro.result()
+        return resultado is not None and not any(resultado is valor for valor in self.no_reutilizar)
+
+    def obtener_o_lanzar(self, clave, lanzar):
+        """Devuelve (futuro, nuevo): reutiliza una descarga del ciclo o lanza una nueva"""
+        with self._lock:
+            if clave in self._futuros and self._reutilizable(self._futuros[clave]):
+                return self._futuros[clave], False
+            futuro = lanzar()
+            self._futuros[clave] = futuro
+            return futuro, True
+
+    def sustituir(self, clave, valor):
+        """Sustituye el resultado de una descarga registrada (p. ej. por el documento ya parseado)"""
+        futuro = Future()
+        futuro.set_result(valor)
+        with self._lock:
+            if clave in self._futuros:
+                self._futuros[clave] = futuro
+
+    def descartar(self, clave):
+        with self._lock:
+            self._futuros.pop(clave, None)
+
+    def limpiar(self):
+        """Olvida todas las descargas: el ciclo siguiente vuelve a pedir los documentos"""
+        with self._lock:
+            self._futuros.clear()
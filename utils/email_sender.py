@@ -1,25 +1,93 @@
 import smtplib
+import socket
+import time
 from email.message import EmailMessage
+from utils.metricas import METRICAS
+
+# Errores de red o del servidor tras los que merece la pena reintentar
+ERRORES_TRANSITORIOS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                        ConnectionError, socket.timeout, TimeoutError)
+
+
+def es_error_transitorio(error):
+    """Errores de conexión o respuestas SMTP 4xx (p. ej. 421 o 451 por límite de envíos)"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, ERRORES_TRANSITORIOS)
+
 
 class EmailSender:
-    def __init__(self, email_config):
+    def __init__(self, email_config, reintentos=3, espera_inicial=2.0):
         self.config = email_config
+        self.reintentos = reintentos
+        self.espera_inicial = espera_inicial
 
-    def send_email(self, subject, content):
-        print(f"Enviando email con asunto: {subject}")
+    def _crear_mensaje(self, subject, content):
         msg = EmailMessage()
         msg.set_content(content)
         msg['Subject'] = subject
         msg['From'] = self.config['sender_email']
         msg['To'] = self.config['recipient_email']
+        return msg
+
+    def _conectar(self):
+        """Abre una conexión SMTP autenticada con STARTTLS"""
+        server = smtplib.SMTP(self.config['smtp_server'], int(self.config['smtp_port']))
+        server.starttls()
+        server.login(self.config['sender_email'], self.config['sender_password'])
+        return server
+
+    def _cerrar(self, server):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def send_email(self, subject, content):
+        return self.send_emails([(subject, content)]) == 1
+
+    @METRICAS.medir('email')
+    def send_emails(self, mensajes):
+        """Envía varios mensajes (asunto, contenido) reutilizando una única conexión.
 
+        Ante errores transitorios se reconecta con espera exponencial. Si no se
+        puede conectar o autenticar (p. ej. credenciales rechazadas) se abandona
+        el lote en lugar de reintentarlo con cada mensaje. Devuelve el número de
+        mensajes enviados.
+        """
+        server = None
+        enviados = 0
         try:
-            with smtplib.SMTP(self.config['smtp_server'], 
-                            int(self.config['smtp_port'])) as server:
-                server.starttls()
-                server.login(self.config['sender_email'], 
-                           self.config['sender_password'])
-                server.send_message(msg)
-                print("Email enviado exitosamente")
-        except Exception as e:
-            print(f"Error al enviar email: {str(e)}") 
\ No newline at end of file
+            for subject, content in mensajes:
+                print(f"Enviando email con asunto: {subject}")
+                for intento in range(self.reintentos + 1):
+                    conectando = server is None
+                    try:
+                        if conectando:
+                            server = self._conectar()
+                        server.send_message(self._crear_mensaje(subject, content))
+                        enviados += 1
+                        METRICAS.contar('emails_enviados_total')
+                        print("Email enviado exitosamente")
+                        break
+                    except Exception as e:
+                        transitorio = es_error_transitorio(e)
+                        if transitorio or conectando:
+                            self._cerrar(server)
+                            server = None
+                        if not transitorio or intento == self.reintentos:
+                            METRICAS.contar('email_errores_total')
+                            print(f"Error al enviar email: {str(e)}")
+                            if conectando:
+                                print(f"Se cancelan los {len(mensajes) - enviados} emails pendientes del lote")
+                                return enviados
+                            break
+                        espera = self.espera_inicial * 2 ** intento
+                        METRICAS.contar('email_reintentos_total')
+                        print(f"Error transitorio al enviar email ({str(e)}), reintento en {espera:.0f}s")
+                        time.sleep(espera)
+        finally:
+            self._cerrar(server)
+        return enviados
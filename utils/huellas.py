@@ -0,0 +1,80 @@
+import hashlib
+import html
+import re
+import unicodedata
+
+# Solo los campos publicados en el RSS: la categoría y el departamento los asigna el
+# clasificador según la configuración y cambiar esta no debe contar como un cambio
+CAMPOS_RSS = ['titulo', 'descripcion', 'link', 'fecha_publicacion']
+CAMPOS_XML = ['texto', 'departamento', 'rango', 'titulo', 'fecha_publicacion']
+# Campos del RSS que pueden traer HTML: su huella se calcula sobre el texto sin etiquetas
+CAMPOS_HTML = ('descripcion',)
+
+# Versión del cálculo de huellas; al subirla los almacenes recalculan la parte 'rss' guardada
+VERSION_HUELLAS = 2
+
+_ESPACIOS = re.compile(r'\s+')
+_ETIQUETAS = re.compile(r'<[^>]*>')
+
+
+def normalizar_texto(texto):
+    """Normaliza Unicode y espacios para que cambios de formato no cuenten como cambios"""
+    texto = unicodedata.normalize('NFKC', texto or '')
+    return _ESPACIOS.sub(' ', texto).strip()
+
+
+def huella_texto(texto):
+    """BLAKE2b de 128 bits del texto normalizado, en hexadecimal"""
+    return hashlib.blake2b(normalizar_texto(texto).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def texto_plano(texto):
+    """Texto sin etiquetas HTML ni entidades.
+
+    feedparser devuelve la descripción saneada y reserializada (<br />) y
+    parsear_rss_boe la devuelve tal cual (<br>); ambas dan el mismo texto plano.
+    """
+    return html.unescape(_ETIQUETAS.sub(' ', texto or ''))
+
+
+def huella_rss(entrada):
+    """Parte 'rss' de la huella: un hash por campo del RSS"""
+    return {campo: huella_texto(texto_plano(entrada.get(campo)) if campo in CAMPOS_HTML
+                                else entrada.get(campo))
+            for campo in CAMPOS_RSS}
+
+
+def calcular_huella(entrada):
+    """Calcula la huella compacta de una entrada: un hash por campo del RSS y del XML"""
+    contenido_xml = entrada.get('contenido_xml')
+    huella_xml = None
+    if contenido_xml:
+        # Los documentos parseados en procesos auxiliares traen ya la huella del XML
+        huella_xml = getattr(contenido_xml, 'huella_xml', None)
+        huella_xml = (dict(huella_xml) if huella_xml else
+                      {campo: huella_texto(contenido_xml.get(campo)) for campo in CAMPOS_XML})
+    return {
+        'rss': huella_rss(entrada),
+        'xml': huella_xml
+    }
+
+
+def rss_modificada(rss_anterior, rss_nueva):
+    """Indica si algún campo del RSS difiere entre dos partes 'rss' de huella.
+
+    Se compara campo a campo: las huellas guardadas con versiones anteriores
+    pueden tener campos que ya no forman parte de la huella.
+    """
+    return any(rss_anterior.get(campo) != rss_nueva[campo] for campo in CAMPOS_RSS)
+
+
+def campos_modificados(huella_anterior, huella_nueva):
+    """Devuelve la lista de campos cuya huella difiere entre dos versiones de una entrada"""
+    cambios = [campo for campo in CAMPOS_RSS
+               if huella_anterior['rss'].get(campo) != huella_nueva['rss'][campo]]
+    # Si no se pudo obtener el XML nuevo no se considera un cambio de contenido
+    if huella_nueva['xml'] is not None:
+        xml_anterior = huella_anterior.get('xml') or {}
+        cambios += [f"contenido_xml.{campo}" for campo in CAMPOS_XML
+                    if xml_anterior.get(campo) != huella_nueva['xml'][campo]]
+    return cambios
@@ -0,0 +1,163 @@
+import bisect
+import contextlib
+import heapq
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+CABECERA = struct.Struct('<8sQ')
+MARCA = b'BOEIDS01'
+
+
+class IndiceIdsConocidos:
+    """Índice persistente de los ids BOE (codificados como enteros) ya almacenados.
+
+    El archivo es una cabecera seguida de los códigos ordenados como uint64
+    (orden de bytes de la máquina) y se abre con mmap: comprobar si un id es
+    conocido es una búsqueda binaria sobre el archivo, sin cargar el historial
+    en memoria. Los ids añadidos se guardan aparte hasta guardar(), que funde
+    ambos en un archivo nuevo con un rename atómico.
+
+    La cabecera anota cuántas entradas tenía el almacén al guardar, para
+    detectar un índice desfasado (p. ej. tras una interrupción) y reconstruirlo.
+    Varios procesos pueden compartir el archivo (demonio y cron): refrescar()
+    lo vuelve a abrir si otro proceso lo ha reescrito, y guardar() hace lo
+    mismo bajo un bloqueo de archivo antes de fundir los ids propios.
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._lock = threading.RLock()
+        self._nuevos = set()
+        self._mmap = None
+        self._codigos = ()
+        self.entradas_almacen = None
+        self._firma = None
+        self._abrir()
+
+    def _firma_archivo(self):
+        try:
+            estado = os.stat(self.archivo)
+        except OSError:
+            return None
+        return estado.st_ino, estado.st_size, estado.st_mtime_ns
+
+    def _abrir(self):
+        try:
+            f = open(self.archivo, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            estado = os.fstat(f.fileno())
+            self._firma = estado.st_ino, estado.st_size, estado.st_mtime_ns
+            tamano = estado.st_size
+            if tamano < CABECERA.size:
+                return
+            marca, entradas_almacen = CABECERA.unpack(f.read(CABECERA.size))
+            if marca != MARCA or (tamano - CABECERA.size) % 8:
+                return
+            self.entradas_almacen = entradas_almacen
+            if tamano == CABECERA.size:
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._codigos = memoryview(self._mmap)[CABECERA.size:].cast('Q')
+
+    def _cerrar_mapa(self):
+        if isinstance(self._codigos, memoryview):
+            self._codigos.release()
+        self._codigos = ()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrar_mapa()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._codigos) + len(self._nuevos)
+
+    def _en_archivo(self, codigo):
+        posicion = bisect.bisect_left(self._codigos, codigo)
+        return posicion < len(self._codigos) and self._codigos[posicion] == codigo
+
+    def __contains__(self, codigo):
+        with self._lock:
+            return codigo in self._nuevos or self._en_archivo(codigo)
+
+    def agregar(self, codigos):
+        with self._lock:
+            self._nuevos.update(codigo for codigo in codigos if codigo is not None)
+
+    def refrescar(self):
+        """Vuelve a abrir el archivo si otro proceso lo ha reescrito desde que se abrió"""
+        with self._lock:
+            if self._firma_archivo() != self._firma:
+                self._cerrar_mapa()
+                self._firma = None
+                self._abrir()
+
+    def desfasado(self, entradas_almacen):
+        """Indica si el índice no corresponde al almacén y hay que reconstruirlo"""
+        return self.entradas_almacen != entradas_almacen
+
+    @contextlib.contextmanager
+    def _bloqueo_archivo(self):
+        """Bloqueo exclusivo entre procesos mientras se reescribe el archivo"""
+        if fcntl is None:
+            yield
+            return
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(f"{self.archivo}.lock", 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def guardar(self, entradas_almacen):
+        """Funde los ids añadidos con los del archivo y lo sustituye de forma atómica"""
+        with self._lock:
+            if not self._nuevos and self.entradas_almacen == entradas_almacen:
+                return
+            with self._bloqueo_archivo():
+                # Se parte del archivo vigente, que otro proceso puede haber reescrito
+                self.refrescar()
+                nuevos = sorted(codigo for codigo in self._nuevos if not self._en_archivo(codigo))
+                self._escribir(heapq.merge(self._codigos, nuevos), entradas_almacen)
+
+    def reconstruir(self, codigos, entradas_almacen):
+        """Reescribe el índice con los códigos indicados (p. ej. leídos del almacén)"""
+        with self._lock, self._bloqueo_archivo():
+            self._escribir(sorted(set(codigo for codigo in codigos if codigo is not None)),
+                           entradas_almacen)
+
+    def _escribir(self, codigos, entradas_almacen):
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{self.archivo}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(CABECERA.pack(MARCA, entradas_almacen))
+            bloque = array('Q')
+            for codigo in codigos:
+                bloque.append(codigo)
+                if len(bloque) >= 65536:
+                    bloque.tofile(f)
+                    bloque = array('Q')
+            bloque.tofile(f)
+        # El mapa del archivo anterior se cierra antes de sustituirlo
+        self._cerrar_mapa()
+        os.replace(temporal, self.archivo)
+        self._nuevos = set()
+        self._abrir()
@@ -0,0 +1,146 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import timedelta
+from utils.almacen import normalizar_fecha
+
+OPERADORES = {'AND', 'OR', 'NOT'}
+_TOKENS_CONSULTA = re.compile(r'"[^"]*"|\S+')
+# Términos que FTS5 acepta sin comillas: palabras con prefijo* y paréntesis de agrupación
+_TERMINO_SIMPLE = re.compile(r'\(*\w+\*?\)*$')
+
+
+class IndiceTextual:
+    """Índice invertido (SQLite FTS5) del texto de los documentos almacenados.
+
+    Se actualiza de forma incremental cada vez que se guardan entradas y
+    permite búsquedas por términos o frases con filtros por departamento,
+    rango y fecha, ordenadas por relevancia (BM25).
+    """
+
+    ESQUEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS documentos USING fts5(
+            titulo, descripcion, texto,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TABLE IF NOT EXISTS documentos_meta (
+            rowid INTEGER PRIMARY KEY,
+            id TEXT UNIQUE NOT NULL,
+            titulo TEXT,
+            departamento TEXT,
+            rango TEXT,
+            fecha_publicacion TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_meta_departamento ON documentos_meta (departamento);
+        CREATE INDEX IF NOT EXISTS idx_meta_rango ON documentos_meta (rango COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_meta_fecha ON documentos_meta (fecha_publicacion);
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        directorio = os.path.dirname(db_file)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conexion = sqlite3.connect(db_file, check_same_thread=False)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.execute('PRAGMA synchronous=NORMAL')
+        self.conexion.executescript(self.ESQUEMA)
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
+
+    def contar(self):
+        with self._lock:
+            return self.conexion.execute("SELECT COUNT(*) FROM documentos_meta").fetchone()[0]
+
+    def indexar(self, entradas):
+        """Añade o reemplaza en el índice un lote de entradas"""
+        with self._lock, self.conexion:
+            for entrada in entradas:
+                contenido_xml = entrada.get('contenido_xml') or {}
+                fila = self.conexion.execute(
+                    "SELECT rowid FROM documentos_meta WHERE id = ?", (entrada['id'],)).fetchone()
+                if fila:
+                    self.conexion.execute("DELETE FROM documentos WHERE rowid = ?", fila)
+                    self.conexion.execute("DELETE FROM documentos_meta WHERE rowid = ?", fila)
+                cursor = self.conexion.execute(
+                    """INSERT INTO documentos_meta (id, titulo, departamento, rango, fecha_publicacion)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (entrada['id'], entrada.get('titulo', ''),
+                     contenido_xml.get('departamento') or entrada.get('departamento', ''),
+                     contenido_xml.get('rango', ''),
+                     normalizar_fecha(entrada.get('fecha_publicacion'))))
+                self.conexion.execute(
+                    "INSERT INTO documentos (rowid, titulo, descripcion, texto) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, entrada.get('titulo', ''), entrada.get('descripcion', ''),
+                     contenido_xml.get('texto', '')))
+
+    def reindexar(self, almacen, tamano_lote=500):
+        """Reconstruye el índice completo a partir del almacén. Devuelve las entradas indexadas"""
+        with self._lock, self.conexion:
+            self.conexion.execute("DELETE FROM documentos")
+            self.conexion.execute("DELETE FROM documentos_meta")
+        total = 0
+        lote = []
+        for entrada in almacen.iterar():
+            lote.append(entrada)
+            if len(lote) >= tamano_lote:
+                self.indexar(lote)
+                total += len(lote)
+                lote = []
+        self.indexar(lote)
+        with self._lock:
+            self.conexion.execute("INSERT INTO documentos (documentos) VALUES ('optimize')")
+            self.conexion.commit()
+        return total + len(lote)
+
+    def buscar(self, consulta, departamento=None, rango=None, desde=None, hasta=None, limite=20):
+        """Busca con sintaxis FTS5 (términos, "frases", OR, NEAR...) y filtros opcionales.
+
+        Devuelve una lista de diccionarios ordenada por relevancia.
+        """
+        sql = """SELECT m.id, m.titulo, m.departamento, m.rango, m.fecha_publicacion,
+                        bm25(documentos, 10.0, 2.0, 1.0) AS puntuacion,
+                        snippet(documentos, 2, '«', '»', '…', 16)
+                 FROM documentos JOIN documentos_meta m ON m.rowid = documentos.rowid
+                 WHERE documentos MATCH ?"""
+        parametros = [consulta]
+        if departamento:
+            sql += " AND m.departamento LIKE ?"
+            parametros.append(f"%{departamento}%")
+        if rango:
+            sql += " AND m.rango = ? COLLATE NOCASE"
+            parametros.append(rango)
+        if desde:
+            sql += " AND m.fecha_publicacion >= ?"
+            parametros.append(desde.isoformat())
+        if hasta:
+            sql += " AND m.fecha_publicacion < ?"
+            parametros.append((hasta + timedelta(days=1)).isoformat())
+        sql += " ORDER BY puntuacion LIMIT ?"
+        parametros.append(limite)
+        with self._lock:
+            filas = self.conexion.execute(sql, parametros).fetchall()
+        claves = ['id', 'titulo', 'departamento', 'rango', 'fecha_publicacion', 'puntuacion', 'fragmento']
+        return [dict(zip(claves, fila)) for fila in filas]
+
+
+def consulta_frase(texto):
+    """Convierte un texto libre en una frase exacta FTS5"""
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def consulta_segura(texto):
+    """Entrecomilla los términos con caracteres especiales para FTS5 ("Decreto-ley", "art:5", comillas
+    sin cerrar...) y mantiene las frases entre comillas, los operadores y los prefijos*"""
+    partes = []
+    for token in _TOKENS_CONSULTA.findall(texto):
+        if token in OPERADORES or _TERMINO_SIMPLE.match(token) \
+                or (len(token) > 1 and token.startswith('"') and token.endswith('"')):
+            partes.append(token)
+        else:
+            partes.append(consulta_frase(token))
+    return ' '.join(partes)
@@ -1,55 +1,171 @@
+import atexit
+import json
 import logging
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+FORMATO_TEXTO = '[%(asctime)s] %(levelname)s [%(threadName)s] - %(message)s'
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+OPCIONES_POR_DEFECTO = {
+    'archivo': 'logs/boe_monitor.log',
+    'nivel': 'INFO',
+    'asincrono': True,
+    'json': False,
+    'max_bytes': 10 * 1024 * 1024,
+    'copias': 5
+}
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON compacta por mensaje"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'hilo': record.threadName,
+            'logger': record.name,
+            'mensaje': record.getMessage()
+        }
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False)
+
+
+class _ManejadorCola(QueueHandler):
+    """Encola el registro sin formatearlo: el formateo se hace en el hilo del listener"""
+
+    def prepare(self, record):
+        return record
+
+
+class _ConfiguracionLogs:
+    """Handlers compartidos por todos los loggers del proceso.
+
+    En modo asíncrono los loggers solo tienen un QueueHandler y un único
+    QueueListener escribe en el archivo rotativo y en la consola, de modo
+    que el hilo que registra el mensaje no espera a la E/S.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opciones = None
+        self.handlers = []
+        self._destinos = []
+        self._listener = None
+        self._loggers = set()
+
+    def configurar(self, **opciones):
+        opciones = {**OPCIONES_POR_DEFECTO, **{clave: valor for clave, valor in opciones.items()
+                                                if valor is not None}}
+        with self._lock:
+            if opciones == self.opciones:
+                return
+            self._detener()
+            Path(opciones['archivo']).parent.mkdir(parents=True, exist_ok=True)
+            formato = (FormatoJSON() if opciones['json']
+                       else logging.Formatter(FORMATO_TEXTO, datefmt=FORMATO_FECHA))
+            destinos = [
+                RotatingFileHandler(opciones['archivo'], maxBytes=opciones['max_bytes'],
+                                    backupCount=opciones['copias'], encoding='utf-8'),
+                logging.StreamHandler()
+            ]
+            for destino in destinos:
+                destino.setFormatter(formato)
+            if opciones['asincrono']:
+                cola = queue.SimpleQueue()
+                self._listener = QueueListener(cola, *destinos, respect_handler_level=True)
+                self._listener.start()
+                self.handlers = [_ManejadorCola(cola)]
+            else:
+                self.handlers = destinos
+            self._destinos = destinos
+            self.opciones = opciones
+            for nombre in self._loggers:
+                self._enganchar(logging.getLogger(nombre))
+
+    def obtener(self, nombre):
+        """Devuelve el logger nombre con los handlers compartidos (sin duplicarlos)"""
+        if self.opciones is None:
+            self.configurar()
+        logger = logging.getLogger(nombre)
+        with self._lock:
+            if nombre not in self._loggers:
+                self._loggers.add(nombre)
+                self._enganchar(logger)
+        return logger
+
+    def _enganchar(self, logger):
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in self.handlers:
+            logger.addHandler(handler)
+        logger.setLevel(self.opciones['nivel'])
+        logger.propagate = False
+
+    def _detener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        for destino in self._destinos:
+            destino.close()
+
+    def detener(self):
+        """Vacía la cola pendiente y cierra los archivos"""
+        with self._lock:
+            self._detener()
+            self.opciones = None
+
+
+_CONFIGURACION = _ConfiguracionLogs()
+atexit.register(_CONFIGURACION.detener)
+
+
+def configurar_logs(opciones=None):
+    """Aplica la sección "logs" de config.json (archivo, nivel, asincrono, json, max_bytes, copias)"""
+    _CONFIGURACION.configurar(**(opciones or {}))
+
+
+def obtener_logger(nombre):
+    return _CONFIGURACION.obtener(nombre)
+
+
 class BOELogger:
-    def __init__(self, log_file="logs/boe_monitor.log"):
-        # Crear directorio de logs si no existe
-        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
-        
-        # Configurar el logger
-        self.logger = logging.getLogger('BOEMonitor')
-        self.logger.setLevel(logging.INFO)
-        
-        # Formato más detallado para los logs
-        formatter = logging.Formatter(
-            '[%(asctime)s] %(levelname)s - %(message)s\n'
-            '           {Process ID: %(process)d - Thread: %(threadName)s}',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Handler para archivo
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        
-        # Handler para consola
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        
-        # Añadir handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
-    def info(self, message):
-        self.logger.info(message)
-    
-    def error(self, message):
-        self.logger.error(message)
-    
-    def warning(self, message):
-        self.logger.warning(message)
-    
-    def debug(self, message):
-        self.logger.debug(message)
-    
-    def success(self, message):
+    """Envoltorio del logger del monitor.
+
+    Los mensajes admiten argumentos al estilo de logging (logger.debug("%s", x)),
+    que solo se formatean si el nivel está activo.
+    """
+
+    def __init__(self, log_file=None):
+        if log_file and _CONFIGURACION.opciones is None:
+            configurar_logs({'archivo': log_file})
+        self.logger = obtener_logger('BOEMonitor')
+
+    def info(self, message, *args):
+        self.logger.info(message, *args)
+
+    def error(self, message, *args):
+        self.logger.error(message, *args)
+
+    def warning(self, message, *args):
+        self.logger.warning(message, *args)
+
+    def debug(self, message, *args):
+        self.logger.debug(message, *args)
+
+    def success(self, message, *args):
         """Método específico para registrar operaciones exitosas"""
-        self.logger.info(f"✅ SUCCESS: {message}")
-    
+        self.logger.info("✅ SUCCESS: " + message, *args)
+
     def start_operation(self, operation_name):
         """Registra el inicio de una operación importante"""
-        self.logger.info(f"▶️ INICIANDO: {operation_name}")
-    
+        self.logger.info("▶️ INICIANDO: %s", operation_name)
+
     def end_operation(self, operation_name):
         """Registra el fin de una operación importante"""
-        self.logger.info(f"⏹️ FINALIZADO: {operation_name}") 
\ No newline at end of file
+        self.logger.info("⏹️ FINALIZADO: %s", operation_name)
@@ -0,0 +1,226 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites (en segundos) de los histogramas de duración
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    valores = ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares)
+    return '{' + valores + '}'
+
+
+class Histograma:
+    """Distribución acumulada por intervalos, al estilo de Prometheus"""
+
+    def __init__(self, limites=LIMITES_DURACION):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.cuenta = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.cuenta += 1
+        self.suma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p):
+        """Estimación del percentil p (0-100) interpolando dentro de la cubeta"""
+        if not self.cuenta:
+            return 0.0
+        objetivo = self.cuenta * p / 100
+        acumulado = 0
+        for indice, cantidad in enumerate(self.cubetas):
+            if cantidad and acumulado + cantidad >= objetivo:
+                inferior = self.limites[indice - 1] if indice else 0.0
+                superior = self.limites[indice] if indice < len(self.limites) else self.maximo
+                return min(self.maximo,
+                           inferior + (superior - inferior) * (objetivo - acumulado) / cantidad)
+            acumulado += cantidad
+        return self.maximo
+
+
+class Metricas:
+    """Registro de contadores e histogramas del proceso, seguro entre hilos.
+
+    Los nombres siguen las convenciones de Prometheus (sufijos _total y
+    _segundos) y se exportan en su formato de texto, como servidor HTTP o
+    como resumen JSON. Prometheus recibe los valores acumulados del proceso;
+    el resumen JSON, solo los del ciclo en curso (desde nuevo_ciclo()), para
+    que en modo demonio cada resumen corresponda a una ejecución.
+    """
+
+    def __init__(self, prefijo='boe_'):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+        self._contadores_ciclo = {}
+        self._histogramas_ciclo = {}
+        self.inicio = self.inicio_ciclo = time.time()
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+            self._contadores_ciclo.clear()
+            self._histogramas_ciclo.clear()
+            self.inicio = self.inicio_ciclo = time.time()
+
+    def nuevo_ciclo(self):
+        """Empieza un nuevo ciclo del resumen JSON sin tocar los valores acumulados"""
+        with self._lock:
+            self._contadores_ciclo.clear()
+            self._histogramas_ciclo.clear()
+            self.inicio_ciclo = time.time()
+
+    def contar(self, nombre, valor=1, **etiquetas):
+        """Incrementa el contador nombre (con sus etiquetas)"""
+        clave = _clave(self.prefijo + nombre, etiquetas)
+        with self._lock:
+            for contadores in (self._contadores, self._contadores_ciclo):
+                contadores[clave] = contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, limites=LIMITES_DURACION, **etiquetas):
+        """Añade una observación al histograma nombre"""
+        clave = _clave(self.prefijo + nombre, etiquetas)
+        with self._lock:
+            for histogramas in (self._histogramas, self._histogramas_ciclo):
+                histograma = histogramas.get(clave)
+                if histograma is None:
+                    histograma = histogramas[clave] = Histograma(limites)
+                histograma.observar(valor)
+
+    @contextmanager
+    def cronometro(self, etapa, **etiquetas):
+        """Mide la duración de un bloque en etapa_duracion_segundos y cuenta sus excepciones"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.contar(f'{etapa}_errores_total', **etiquetas)
+            raise
+        finally:
+            self.observar(f'{etapa}_duracion_segundos', time.perf_counter() - inicio, **etiquetas)
+
+    def medir(self, etapa):
+        """Decorador equivalente a cronometro para una función completa"""
+        def decorador(funcion):
+            @wraps(funcion)
+            def envoltorio(*args, **kwargs):
+                with self.cronometro(etapa):
+                    return funcion(*args, **kwargs)
+            return envoltorio
+        return decorador
+
+    def formato_prometheus(self):
+        """Devuelve todas las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted(self._histogramas.items(), key=lambda item: item[0])
+            lineas = []
+            tipos = set()
+            for (nombre, etiquetas), valor in contadores:
+                if nombre not in tipos:
+                    tipos.add(nombre)
+                    lineas.append(f'# TYPE {nombre} counter')
+                lineas.append(f'{nombre}{_formatear_etiquetas(etiquetas)} {valor}')
+            for (nombre, etiquetas), histograma in histogramas:
+                if nombre not in tipos:
+                    tipos.add(nombre)
+                    lineas.append(f'# TYPE {nombre} histogram')
+                acumulado = 0
+                for limite, cantidad in zip(list(histograma.limites) + ['+Inf'], histograma.cubetas):
+                    acumulado += cantidad
+                    lineas.append(f'{nombre}_bucket{_formatear_etiquetas(etiquetas, [("le", limite)])} '
+                                  f'{acumulado}')
+                lineas.append(f'{nombre}_sum{_formatear_etiquetas(etiquetas)} {histograma.suma:.6f}')
+                lineas.append(f'{nombre}_count{_formatear_etiquetas(etiquetas)} {histograma.cuenta}')
+        return '\n'.join(lineas) + '\n'
+
+    def resumen(self):
+        """Resumen del ciclo en curso: contadores y, por histograma, cuenta, suma y percentiles"""
+        def nombre_completo(nombre, etiquetas):
+            return nombre + _formatear_etiquetas(etiquetas)
+
+        with self._lock:
+            return {
+                'inicio': self.inicio_ciclo,
+                'duracion_segundos': round(time.time() - self.inicio_ciclo, 3),
+                'contadores': {nombre_completo(*clave): valor
+                               for clave, valor in sorted(self._contadores_ciclo.items())},
+                'histogramas': {
+                    nombre_completo(*clave): {
+                        'cuenta': histograma.cuenta,
+                        'suma': round(histograma.suma, 6),
+                        'media': round(histograma.suma / histograma.cuenta, 6) if histograma.cuenta else 0.0,
+                        'p50': round(histograma.percentil(50), 6),
+                        'p95': round(histograma.percentil(95), 6),
+                        'p99': round(histograma.percentil(99), 6),
+                        'max': round(histograma.maximo, 6)
+                    }
+                    for clave, histograma in sorted(self._histogramas_ciclo.items(), key=lambda item: item[0])
+                }
+            }
+
+    def escribir_textfile(self, ruta):
+        """Escribe las métricas de forma atómica (para el textfile collector de node_exporter)"""
+        self._escribir(ruta, self.formato_prometheus())
+
+    def guardar_resumen(self, ruta):
+        self._escribir(ruta, json.dumps(self.resumen(), ensure_ascii=False, indent=2))
+
+    def _escribir(self, ruta, contenido):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def servir_http(self, puerto, direccion='0.0.0.0'):
+        """Publica /metrics en un hilo en segundo plano. Devuelve el servidor"""
+        metricas = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.formato_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+        threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+        return servidor
+
+
+# Registro compartido por todo el proceso
+METRICAS = Metricas()
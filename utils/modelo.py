@@ -0,0 +1,138 @@
+import sys
+import threading
+from collections import OrderedDict
+from utils.almacen import codificar_boe_id, extraer_boe_id, normalizar_fecha
+from utils.huellas import CAMPOS_RSS, CAMPOS_XML
+
+# Bytes de cada hash de campo en la huella (BLAKE2b de 128 bits)
+BYTES_HUELLA = 16
+
+
+def codigo_entrada(entrada):
+    """Código entero del id BOE de una entrada (por su id o su enlace), o None"""
+    return codificar_boe_id(extraer_boe_id(entrada.get('id'), entrada.get('link')))
+
+
+def empaquetar_huella(huella):
+    """Huella {'rss': {...}, 'xml': {...}} → bytes con los hashes de campo seguidos.
+
+    Devuelve la huella sin cambios si no tiene el formato esperado (p. ej. la
+    de una versión antigua), para no perder información.
+    """
+    if not huella:
+        return None
+    try:
+        hashes = [huella['rss'][campo] for campo in CAMPOS_RSS]
+        if huella.get('xml') is not None:
+            hashes += [huella['xml'][campo] for campo in CAMPOS_XML]
+        if any(len(valor) != 2 * BYTES_HUELLA for valor in hashes):
+            return huella
+        return bytes.fromhex(''.join(hashes))
+    except (KeyError, TypeError, ValueError):
+        return huella
+
+
+def desempaquetar_huella(empaquetada):
+    if empaquetada is None or isinstance(empaquetada, dict):
+        return dict(empaquetada) if empaquetada else None
+    hashes = [empaquetada[inicio:inicio + BYTES_HUELLA].hex()
+              for inicio in range(0, len(empaquetada), BYTES_HUELLA)]
+    return {
+        'rss': dict(zip(CAMPOS_RSS, hashes)),
+        'xml': dict(zip(CAMPOS_XML, hashes[len(CAMPOS_RSS):])) if len(hashes) > len(CAMPOS_RSS) else None
+    }
+
+
+class HuellaCompacta:
+    """Huella empaquetada en bytes y el instante de su última revisión.
+
+    La huella se reconstruye al pedirla.
+    """
+
+    __slots__ = ('_huella', 'revisado')
+
+    def __init__(self, huella):
+        self.huella = huella
+
+    @property
+    def huella(self):
+        huella = desempaquetar_huella(self._huella)
+        if huella is not None and self.revisado is not None:
+            huella['revisado'] = self.revisado
+        return huella
+
+    @huella.setter
+    def huella(self, huella):
+        self._huella = empaquetar_huella(huella)
+        self.revisado = huella.get('revisado') if huella else None
+
+
+class EntradaCompacta(HuellaCompacta):
+    """Lo que se mantiene en memoria de una entrada almacenada.
+
+    Solo guarda lo necesario para detectar cambios y ordenar: el id BOE como
+    entero, departamento y rango internados (se repiten en miles de entradas)
+    y la huella compacta.
+    """
+
+    __slots__ = ('id', 'boe_id', 'fecha_publicacion', 'departamento', 'rango')
+
+    def __init__(self, id_entrada, huella, boe_id=None, fecha_publicacion='', departamento='', rango=''):
+        self.id = id_entrada
+        self.boe_id = boe_id
+        self.fecha_publicacion = fecha_publicacion
+        self.departamento = sys.intern(departamento or '')
+        self.rango = sys.intern(rango or '')
+        super().__init__(huella)
+
+    @classmethod
+    def desde_entrada(cls, datos, huella):
+        contenido_xml = datos.get('contenido_xml') or {}
+        return cls(datos['id'], huella, codigo_entrada(datos),
+                   normalizar_fecha(datos.get('fecha_publicacion')),
+                   contenido_xml.get('departamento') or datos.get('departamento', ''),
+                   contenido_xml.get('rango', ''))
+
+
+class IndiceHuellas:
+    """Huellas de las entradas vistas recientemente, para el modo demonio.
+
+    Guarda como mucho `maximo` huellas compactas y descarta las usadas hace
+    más tiempo, de modo que la memoria no crece con los años de historial:
+    las que salen se vuelven a leer del almacén si reaparecen en el feed.
+    """
+
+    def __init__(self, maximo=50000):
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, ids):
+        """Devuelve {id: huella} de los ids presentes en el índice"""
+        huellas = {}
+        with self._lock:
+            for id_entrada in ids:
+                entrada = self._entradas.get(id_entrada)
+                if entrada is not None:
+                    self._entradas.move_to_end(id_entrada)
+                    huellas[id_entrada] = entrada.huella
+        return huellas
+
+    def recordar(self, huellas):
+        """Añade o actualiza las huellas de los pares (id, huella) indicados"""
+        with self._lock:
+            for id_entrada, huella in huellas:
+                self._entradas[id_entrada] = HuellaCompacta(huella)
+                self._entradas.move_to_end(id_entrada)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def marcar_revisadas(self, ids, instante):
+        with self._lock:
+            for id_entrada in ids:
+                entrada = self._entradas.get(id_entrada)
+                if entrada is not None:
+                    entrada.revisado = instante
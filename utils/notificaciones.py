@@ -0,0 +1,40 @@
+import threading
+
+
+class ColaNotificaciones:
+    """Acumula los avisos de una ejecución y los envía todos al final.
+
+    modo='resumen' envía un único correo con todos los avisos; modo='lote'
+    envía cada aviso como correo individual sobre una sola conexión SMTP.
+    """
+
+    SEPARADOR = '\n\n' + '━' * 40 + '\n\n'
+
+    def __init__(self, email_sender, modo='resumen'):
+        self.email_sender = email_sender
+        self.modo = modo
+        self._lock = threading.Lock()
+        self._avisos = []
+
+    def agregar(self, asunto, contenido):
+        with self._lock:
+            self._avisos.append((asunto, contenido))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._avisos)
+
+    def enviar(self, asunto_resumen, texto_resumen=''):
+        """Entrega los avisos pendientes y vacía la cola. Devuelve los correos enviados"""
+        with self._lock:
+            avisos, self._avisos = self._avisos, []
+        if not avisos:
+            return 0
+        if self.modo == 'lote':
+            mensajes = avisos + [(asunto_resumen, texto_resumen)] if texto_resumen else avisos
+        else:
+            cuerpo = self.SEPARADOR.join(f"{asunto}\n\n{contenido}" for asunto, contenido in avisos)
+            if texto_resumen:
+                cuerpo = f"{texto_resumen}{self.SEPARADOR}{cuerpo}"
+            mensajes = [(f"{asunto_resumen} ({len(avisos)} avisos)", cuerpo)]
+        return self.email_sender.send_emails(mensajes)
@@ -0,0 +1,80 @@
+import xml.etree.ElementTree as ET
+from utils.parser_xml import _fragmentos
+
+# Elementos de cada <item> del RSS del BOE y la clave equivalente de feedparser
+CAMPOS_ITEM = {'guid': 'id', 'title': 'title', 'description': 'summary',
+               'link': 'link', 'pubDate': 'published'}
+
+
+class FormatoRSSDesconocido(ValueError):
+    """El feed no es un RSS 2.0 con el esquema del BOE"""
+
+
+def parsear_rss_boe(xml_content):
+    """Parsea en streaming un feed RSS 2.0 del BOE.
+
+    `xml_content` puede ser str, bytes o un iterable de fragmentos. Genera
+    diccionarios con las mismas claves que feedparser (id, title, summary,
+    link, published) para pasarlos a procesar_entrada_boe; cada <item> se
+    descarta del árbol en cuanto se ha leído. Lanza ET.ParseError si el XML
+    está mal formado y FormatoRSSDesconocido si no es un RSS 2.0.
+
+    A diferencia de feedparser, summary se devuelve tal como viene en el feed,
+    sin sanear ni reserializar el HTML (<br> y no <br />). La huella de la
+    descripción se calcula sobre el texto sin etiquetas (huellas.texto_plano),
+    así que el cambio de parser no cuenta como un cambio de la entrada.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    raiz = None
+
+    def procesar_eventos():
+        nonlocal raiz
+        for evento, elem in parser.read_events():
+            if evento == 'start':
+                if raiz is None:
+                    raiz = elem
+                    if elem.tag != 'rss':
+                        raise FormatoRSSDesconocido(f"Elemento raíz inesperado: {elem.tag}")
+                continue
+            if elem.tag != 'item':
+                continue
+            entrada = dict.fromkeys(CAMPOS_ITEM.values(), '')
+            for hijo in elem:
+                clave = CAMPOS_ITEM.get(hijo.tag)
+                if clave and hijo.text:
+                    entrada[clave] = hijo.text.strip()
+            # Los items ya leídos cuelgan de <channel>: se vacía para no acumularlos
+            elem.clear()
+            canal = raiz.find('channel')
+            if canal is not None:
+                canal.clear()
+            yield entrada
+
+    for fragmento in _fragmentos(xml_content):
+        parser.feed(fragmento)
+        yield from procesar_eventos()
+    parser.close()
+    yield from procesar_eventos()
+
+
+def leer_entradas_rss(fragmentos):
+    """Entradas de un feed RSS leyendo sus fragmentos una sola vez.
+
+    Usa parsear_rss_boe y, si el feed no tiene el formato esperado, recurre a
+    feedparser (que solo se importa en ese caso) con el contenido completo.
+    """
+    recibidos = []
+
+    def guardando():
+        for fragmento in _fragmentos(fragmentos):
+            recibidos.append(fragmento)
+            yield fragmento
+
+    lector = guardando()
+    try:
+        return list(parsear_rss_boe(lector))
+    except (ET.ParseError, FormatoRSSDesconocido):
+        recibidos.extend(lector)
+        import feedparser
+        vacio = b'' if recibidos and isinstance(recibidos[0], bytes) else ''
+        return feedparser.parse(vacio.join(recibidos)).entries
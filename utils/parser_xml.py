@@ -0,0 +1,86 @@
+import xml.etree.ElementTree as ET
+
+CAMPOS_METADATOS = ['departamento', 'rango', 'titulo', 'fecha_publicacion']
+TAMANO_FRAGMENTO = 64 * 1024
+# Separador que se añade tras cada elemento del cuerpo (<texto>) de estos tipos
+SEPARADORES = {**dict.fromkeys(['p', 'br', 'li', 'tr', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], '\n'),
+               'td': ' ', 'th': ' '}
+
+
+def _fragmentos(xml_content):
+    if isinstance(xml_content, (str, bytes)):
+        for inicio in range(0, len(xml_content), TAMANO_FRAGMENTO):
+            yield xml_content[inicio:inicio + TAMANO_FRAGMENTO]
+    else:
+        yield from xml_content
+
+
+def parsear_documento(xml_content):
+    """Parsea en streaming un documento XML del BOE en una sola pasada.
+
+    `xml_content` puede ser str, bytes o un iterable de fragmentos (por ejemplo
+    `response.iter_content()`). Cada elemento se descarta del árbol en cuanto se
+    cierra, por lo que la memoria no crece con el tamaño del documento.
+    Lanza ET.ParseError si el XML está mal formado.
+
+    Del cuerpo (<texto>, con sus párrafos <p>, tablas...) se recoge el texto y
+    la cola de cada elemento antes de descartarlo: el texto está completo en
+    el evento siguiente a la apertura y la cola en el siguiente al cierre.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    textos = []
+    metadatos = dict.fromkeys(CAMPOS_METADATOS)
+    pila = []
+    cuerpo = []
+    # Elementos abiertos dentro de <texto> (él incluido)
+    dentro_texto = 0
+    # (elemento, 'text' o 'tail') del cuerpo que se lee en el evento siguiente
+    pendiente = None
+
+    def procesar_eventos():
+        nonlocal dentro_texto, pendiente
+        for evento, elem in parser.read_events():
+            if pendiente:
+                anterior, atributo = pendiente
+                trozo = getattr(anterior, atributo)
+                if trozo:
+                    cuerpo.append(trozo)
+                if atributo == 'tail':
+                    anterior.clear()
+                pendiente = None
+            if evento == 'start':
+                pila.append(elem)
+                if dentro_texto or elem.tag == 'texto':
+                    dentro_texto += 1
+                    pendiente = (elem, 'text')
+                continue
+            pila.pop()
+            if dentro_texto:
+                dentro_texto -= 1
+                if not dentro_texto:
+                    if cuerpo:
+                        textos.append(''.join(cuerpo))
+                        cuerpo.clear()
+                else:
+                    separador = SEPARADORES.get(elem.tag)
+                    if separador and cuerpo and not cuerpo[-1].endswith(separador):
+                        cuerpo.append(separador)
+                    # Se vacía tras leer su cola, que puede no haber llegado todavía
+                    pendiente = (elem, 'tail')
+            elif elem.tag in metadatos and metadatos[elem.tag] is None:
+                metadatos[elem.tag] = elem.text or ''
+            if pendiente is None or pendiente[0] is not elem:
+                elem.clear()
+            # Al cerrarse, el elemento es siempre el último hijo de su padre
+            if pila:
+                del pila[-1][-1]
+
+    for fragmento in _fragmentos(xml_content):
+        parser.feed(fragmento)
+        procesar_eventos()
+    parser.close()
+    procesar_eventos()
+
+    resultado = {'texto': '\n'.join(textos)}
+    resultado.update((campo, valor or '') for campo, valor in metadatos.items())
+    return resultado
@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+
+# Claves calculadas durante el procesamiento que no se guardan en la cola
+CLAVES_DESCARTADAS = ('contenido_xml', 'huella', 'coincidencias')
+
+
+class ColaPendientes:
+    """Entradas cuya descarga falló por un problema transitorio de boe.es.
+
+    Se persisten en un archivo JSON para que la siguiente ejecución (o el
+    siguiente ciclo del demonio) las vuelva a pasar por el pipeline en cuanto
+    el servidor esté disponible, en lugar de guardarlas sin contenido.
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._entradas = self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                return {entrada['id']: entrada for entrada in json.load(f)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def agregar(self, entradas):
+        with self._lock:
+            for entrada in entradas:
+                self._entradas[entrada['id']] = {clave: valor for clave, valor in entrada.items()
+                                                 if clave not in CLAVES_DESCARTADAS}
+            self._guardar()
+
+    def extraer(self):
+        """Devuelve las entradas pendientes y vacía la cola"""
+        with self._lock:
+            entradas = list(self._entradas.values())
+            if entradas:
+                self._entradas = {}
+                self._guardar()
+            return entradas
+
+    def _guardar(self):
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{self.archivo}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(list(self._entradas.values()), f, ensure_ascii=False)
+        os.replace(temporal, self.archivo)
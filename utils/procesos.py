@@ -0,0 +1,113 @@
+import json
+import multiprocessing
+import threading
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.coincidencias import BuscadorInclusiones
+from utils.huellas import CAMPOS_XML, huella_texto
+from utils.parser_xml import parsear_documento
+
+# Campos de la entrada del RSS que necesita la evaluación de inclusiones
+CAMPOS_EVALUACION = ['titulo', 'descripcion', 'departamento']
+
+# XML descargado sin parsear; `headers` permite registrar después sus validadores HTTP
+DocumentoCrudo = namedtuple('DocumentoCrudo', ['contenido', 'headers'])
+
+
+class DocumentoProcesado(dict):
+    """contenido_xml parseado en un proceso auxiliar, con la huella de sus campos ya calculada"""
+
+    def __init__(self, datos, huella_xml):
+        super().__init__(datos)
+        self.huella_xml = huella_xml
+
+
+# Estado de cada proceso auxiliar: el buscador se compila una vez por configuración
+_buscador = None
+_clave_inclusiones = None
+
+
+def _buscador_para(inclusiones):
+    global _buscador, _clave_inclusiones
+    if inclusiones is None:
+        return None
+    clave = json.dumps(inclusiones, sort_keys=True)
+    if clave != _clave_inclusiones:
+        _buscador = BuscadorInclusiones(inclusiones)
+        _clave_inclusiones = clave
+    return _buscador
+
+
+def _procesar_lote(lote, inclusiones):
+    """Parsea, calcula la huella y evalúa las inclusiones de un lote de documentos.
+
+    Devuelve [(clave, DocumentoProcesado o None, coincidencia)]. De los documentos
+    que no cumplen las inclusiones no se devuelve el texto.
+    """
+    buscador = _buscador_para(inclusiones)
+    resultados = []
+    for clave, metadatos, contenido in lote:
+        try:
+            documento = parsear_documento(contenido)
+        except ET.ParseError:
+            resultados.append((clave, None, None))
+            continue
+        huella_xml = {campo: huella_texto(documento.get(campo)) for campo in CAMPOS_XML}
+        coincidencia = None
+        if buscador is not None:
+            coincidencia = buscador.evaluar({**metadatos, 'contenido_xml': documento})
+            if coincidencia is None:
+                del documento['texto']
+        resultados.append((clave, DocumentoProcesado(documento, huella_xml), coincidencia))
+    return resultados
+
+
+class ProcesadorDocumentos:
+    """Reparte el parseo y la evaluación de los documentos XML entre varios procesos.
+
+    Los documentos se envían en lotes para amortizar la comunicación entre
+    procesos. Los procesos se arrancan con 'spawn' la primera vez que se usan:
+    el proceso principal tiene hilos (logs, descargas) y un fork podría
+    heredar sus locks bloqueados.
+    """
+
+    def __init__(self, procesos, tamano_lote=8):
+        self.procesos = procesos
+        self.tamano_lote = tamano_lote
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.procesos, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def procesar(self, documentos, inclusiones=None):
+        """Procesa [(clave, entrada, xml en bytes)] y devuelve {clave: (contenido o None, coincidencia)}.
+
+        Sin `inclusiones` no se evalúa nada y todos los documentos conservan el texto.
+        """
+        documentos = [(clave, {campo: entrada.get(campo, '') for campo in CAMPOS_EVALUACION}, contenido)
+                      for clave, entrada, contenido in documentos]
+        if not documentos:
+            return {}
+        # Lotes más pequeños si hay pocos documentos, para ocupar todos los procesos
+        tamano = max(1, min(self.tamano_lote, -(-len(documentos) // self.procesos)))
+        pool = self._pool()
+        futuros = [pool.submit(_procesar_lote, documentos[inicio:inicio + tamano], inclusiones)
+                   for inicio in range(0, len(documentos), tamano)]
+        resultados = {}
+        for futuro in futuros:
+            for clave, documento, coincidencia in futuro.result():
+                resultados[clave] = (documento, coincidencia)
+        return resultados
+
+    def cerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,212 @@
+import difflib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from utils.huellas import huella_texto
+
+# Campos de metadatos que forman parte de cada versión, antes del texto
+CAMPOS_VERSIONADOS = ['titulo', 'descripcion', 'departamento', 'rango']
+
+# Cada cuántas versiones se guarda el texto completo en lugar de un delta
+INTERVALO_COMPLETO = 20
+
+# Corte tras cada salto de línea y tras cada punto, punto y coma o dos puntos
+# seguidos de espacio: los párrafos largos del BOE se comparan por frases
+_CORTES = re.compile(r'(?<=\n)|(?<=[.;:] )')
+
+
+def fragmentar(texto):
+    """Divide el texto en líneas/frases; ''.join(fragmentos) lo reconstruye exactamente"""
+    return [fragmento for fragmento in _CORTES.split(texto) if fragmento]
+
+
+def documento_versionado(entrada):
+    """Texto que se versiona de una entrada: sus metadatos seguidos del texto del documento"""
+    contenido_xml = entrada.get('contenido_xml') or {}
+    cabecera = ''.join(
+        f"{campo}: {contenido_xml.get(campo) or entrada.get(campo) or ''}\n"
+        for campo in CAMPOS_VERSIONADOS)
+    return cabecera + '\n' + (contenido_xml.get('texto') or '')
+
+
+def calcular_delta(anterior, nuevo):
+    """Delta entre dos listas de fragmentos: copias de rangos del anterior e inserciones.
+
+    El prefijo y el sufijo comunes se copian sin compararlos. El resto se
+    compara como códigos enteros (uno por fragmento distinto) con la heurística
+    de difflib para fragmentos muy repetidos, que evita el coste cuadrático en
+    documentos largos con líneas repetidas a cambio de un delta algo mayor.
+    """
+    limite = min(len(anterior), len(nuevo))
+    inicio = 0
+    while inicio < limite and anterior[inicio] == nuevo[inicio]:
+        inicio += 1
+    fin = 0
+    while fin < limite - inicio and anterior[-1 - fin] == nuevo[-1 - fin]:
+        fin += 1
+    codigos = {}
+    medio_anterior = [codigos.setdefault(fragmento, len(codigos))
+                      for fragmento in anterior[inicio:len(anterior) - fin]]
+    medio_nuevo = [codigos.setdefault(fragmento, len(codigos))
+                   for fragmento in nuevo[inicio:len(nuevo) - fin]]
+    operaciones = [['c', 0, inicio]] if inicio else []
+    emparejador = difflib.SequenceMatcher(None, medio_anterior, medio_nuevo)
+    for etiqueta, i1, i2, j1, j2 in emparejador.get_opcodes():
+        if etiqueta == 'equal':
+            operaciones.append(['c', inicio + i1, inicio + i2])
+        elif etiqueta in ('replace', 'insert'):
+            operaciones.append(['i', nuevo[inicio + j1:inicio + j2]])
+    if fin:
+        operaciones.append(['c', len(anterior) - fin, len(anterior)])
+    return operaciones
+
+
+def aplicar_delta(anterior, operaciones):
+    resultado = []
+    for operacion in operaciones:
+        if operacion[0] == 'c':
+            resultado.extend(anterior[operacion[1]:operacion[2]])
+        else:
+            resultado.extend(operacion[1])
+    return resultado
+
+
+def diferencia_unificada(anterior, nuevo, max_lineas=200):
+    """Diff legible (formato unified) entre dos textos, recortado para avisos por correo"""
+    lineas = list(difflib.unified_diff(
+        [fragmento.rstrip('\n') for fragmento in fragmentar(anterior)],
+        [fragmento.rstrip('\n') for fragmento in fragmentar(nuevo)],
+        'anterior', 'actual', n=1, lineterm=''))
+    if len(lineas) > max_lineas:
+        lineas = lineas[:max_lineas] + [f"... ({len(lineas) - max_lineas} líneas más)"]
+    return '\n'.join(lineas)
+
+
+class HistorialVersiones:
+    """Historial de versiones de los documentos en SQLite.
+
+    La primera versión (y una de cada INTERVALO_COMPLETO) se guarda completa;
+    el resto como delta por líneas/frases respecto a la anterior, comprimido.
+    Con cada versión se guarda también el diff legible frente a la anterior,
+    de modo que los avisos de cambios no tienen que calcularlo.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS versiones (
+            id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            fecha TEXT NOT NULL,
+            huella TEXT NOT NULL,
+            completo BLOB,
+            delta BLOB,
+            diff TEXT,
+            PRIMARY KEY (id, version)
+        );
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        directorio = os.path.dirname(db_file)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conexion = sqlite3.connect(db_file, check_same_thread=False)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.execute('PRAGMA synchronous=NORMAL')
+        self.conexion.executescript(self.ESQUEMA)
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
+
+    def _ultima(self, id_documento):
+        return self.conexion.execute(
+            "SELECT version, huella FROM versiones WHERE id = ? ORDER BY version DESC LIMIT 1",
+            (id_documento,)).fetchone()
+
+    def registrar(self, id_documento, texto):
+        """Añade una versión si el texto ha cambiado. Devuelve su número o None si no cambió"""
+        huella = huella_texto(texto)
+        with self._lock, self.conexion:
+            ultima = self._ultima(id_documento)
+            if ultima and ultima[1] == huella:
+                return None
+            version = ultima[0] + 1 if ultima else 1
+            completo = delta = diff = None
+            if ultima:
+                anterior = self._reconstruir(id_documento, ultima[0])
+                diff = diferencia_unificada(anterior, texto)
+            if version % INTERVALO_COMPLETO == 1:
+                completo = zlib.compress(texto.encode('utf-8'))
+            else:
+                operaciones = calcular_delta(fragmentar(anterior), fragmentar(texto))
+                delta = zlib.compress(json.dumps(operaciones, ensure_ascii=False).encode('utf-8'))
+            self.conexion.execute(
+                """INSERT INTO versiones (id, version, fecha, huella, completo, delta, diff)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (id_documento, version, datetime.now().isoformat(), huella, completo, delta, diff))
+            return version
+
+    def registrar_entradas(self, entradas):
+        """Versiona las entradas con contenido. Devuelve {id: versión} de las que cambiaron"""
+        registradas = {}
+        for entrada in entradas:
+            if not entrada.get('contenido_xml'):
+                continue
+            version = self.registrar(entrada['id'], documento_versionado(entrada))
+            if version:
+                registradas[entrada['id']] = version
+        return registradas
+
+    def _reconstruir(self, id_documento, version):
+        completa = self.conexion.execute(
+            """SELECT version, completo FROM versiones
+               WHERE id = ? AND version <= ? AND completo IS NOT NULL
+               ORDER BY version DESC LIMIT 1""", (id_documento, version)).fetchone()
+        if completa is None:
+            raise KeyError(f"{id_documento} v{version}")
+        fragmentos = fragmentar(zlib.decompress(completa[1]).decode('utf-8'))
+        deltas = self.conexion.execute(
+            """SELECT delta FROM versiones WHERE id = ? AND version > ? AND version <= ?
+               ORDER BY version""", (id_documento, completa[0], version))
+        for (delta,) in deltas:
+            fragmentos = aplicar_delta(fragmentos, json.loads(zlib.decompress(delta)))
+        return ''.join(fragmentos)
+
+    def texto(self, id_documento, version=None):
+        """Reconstruye una versión (por defecto la última)"""
+        with self._lock:
+            if version is None:
+                ultima = self._ultima(id_documento)
+                if ultima is None:
+                    raise KeyError(id_documento)
+                version = ultima[0]
+            return self._reconstruir(id_documento, version)
+
+    def versiones(self, id_documento):
+        """Lista [{'version', 'fecha'}] de un documento"""
+        with self._lock:
+            filas = self.conexion.execute(
+                "SELECT version, fecha FROM versiones WHERE id = ? ORDER BY version",
+                (id_documento,)).fetchall()
+        return [{'version': version, 'fecha': fecha} for version, fecha in filas]
+
+    def diferencia(self, id_documento, version=None, desde=None):
+        """Diff de una versión (por defecto la última) frente a `desde` (por defecto la anterior)"""
+        with self._lock:
+            if version is None:
+                ultima = self._ultima(id_documento)
+                if ultima is None:
+                    return ''
+                version = ultima[0]
+            if desde is None or desde == version - 1:
+                fila = self.conexion.execute(
+                    "SELECT diff FROM versiones WHERE id = ? AND version = ?",
+                    (id_documento, version)).fetchone()
+                return (fila[0] or '') if fila else ''
+            return diferencia_unificada(self._reconstruir(id_documento, desde),
+                                        self._reconstruir(id_documento, version))